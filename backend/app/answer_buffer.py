@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.models import AttemptItem
+
+logger = logging.getLogger(__name__)
+
+FLUSH_CHUNK_SIZE = 500  # 1文あたりの行数（SQLiteのバインド変数上限対策）
+
+
+async def upsert_attempt_items(db: AsyncSession, rows: List[dict]) -> None:
+    """AttemptItemを (attempt_id, question_id) キーで一括upsert"""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(AttemptItem).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AttemptItem.attempt_id, AttemptItem.question_id],
+            set_={
+                "selected": stmt.excluded.selected,
+                "is_correct": stmt.excluded.is_correct
+            }
+        )
+        await db.execute(stmt)
+        return
+
+    # ON CONFLICTをサポートしないDBの場合は既存行を1クエリで取得して更新
+    result = await db.execute(
+        select(AttemptItem).where(
+            AttemptItem.attempt_id.in_({row["attempt_id"] for row in rows}),
+            AttemptItem.question_id.in_({row["question_id"] for row in rows})
+        )
+    )
+    existing_items = {(item.attempt_id, item.question_id): item for item in result.scalars()}
+    for row in rows:
+        attempt_item = existing_items.get((row["attempt_id"], row["question_id"]))
+        if attempt_item:
+            attempt_item.selected = row["selected"]
+            attempt_item.is_correct = row["is_correct"]
+        else:
+            db.add(AttemptItem(**row))
+
+
+class AnswerBuffer:
+    """回答の書き込みをまとめるインプロセスバッファ（write-behind）
+
+    受験中の回答は (attempt_id, question_id) ごとに最新の1件だけを保持し、
+    一定間隔・試験終了時・シャットダウン時にまとめてAttemptItemへ書き込む。
+    書き込み前にプロセスが落ちた場合、最大でflush間隔分の回答が失われる。
+    バッファはプロセス単位なので、複数ワーカー構成では同じ受験を同じワーカーに振り分ける必要がある。
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, Dict[int, dict]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+
+    def add(self, attempt_id: int, rows: List[dict]) -> None:
+        with self._lock:
+            items = self._pending.setdefault(attempt_id, {})
+            for row in rows:
+                items[row["question_id"]] = row
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(items) for items in self._pending.values())
+
+    def _take(self, attempt_id: Optional[int] = None) -> Dict[int, Dict[int, dict]]:
+        with self._lock:
+            if attempt_id is None:
+                taken, self._pending = self._pending, {}
+                return taken
+            items = self._pending.pop(attempt_id, None)
+            return {attempt_id: items} if items else {}
+
+    def _restore(self, taken: Dict[int, Dict[int, dict]]) -> None:
+        """書き込みに失敗した行を戻す（その間に届いた新しい回答を優先）"""
+        with self._lock:
+            for attempt_id, rows in taken.items():
+                items = self._pending.setdefault(attempt_id, {})
+                for question_id, row in rows.items():
+                    items.setdefault(question_id, row)
+
+    async def flush(self, attempt_id: Optional[int] = None) -> int:
+        """バッファ内の回答を1トランザクションで書き込む（attempt_id指定時はその受験のみ）
+
+        flushは直列に実行されるため、戻った時点でそれ以前に受け付けた回答はDBに反映済み。
+        """
+        async with self._flush_lock:
+            taken = self._take(attempt_id)
+            rows = [row for items in taken.values() for row in items.values()]
+            if not rows:
+                return 0
+            try:
+                async with AsyncSessionLocal() as db:
+                    for i in range(0, len(rows), FLUSH_CHUNK_SIZE):
+                        await upsert_attempt_items(db, rows[i:i + FLUSH_CHUNK_SIZE])
+                    await db.commit()
+            except BaseException:
+                self._restore(taken)
+                raise
+            return len(rows)
+
+    async def run_periodic_flush(self, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("回答バッファの書き込みに失敗しました（次回再試行）")
+
+
+answer_buffer = AnswerBuffer()
@@ -0,0 +1,108 @@
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.exam_cache import answer_key_cache
+from app.models import Question, Section
+
+
+class QuestionKey(NamedTuple):
+    """1問分の正解情報"""
+    correct: FrozenSet[str]  # 採点用（選択順は問わない）
+    answer: List[str]  # レスポンス用（保存されている順序のまま）
+    explanation: Optional[str]
+    section_index: int  # ExamAnswerKey.sections 内の位置
+    weight: int
+    bit: int  # 正解ビットマスク上のこの問題のビット（1 << 試験内の位置）
+
+
+class ExamAnswerKey(NamedTuple):
+    """試験1件分の正解キー（採点時にquestionsテーブルを読まずに済むようにする）"""
+    questions: Dict[int, QuestionKey]
+    sections: List[Tuple[int, str]]  # (section_id, title) をsection_id順に保持
+    section_weights: List[int]
+    section_masks: List[int]  # セクションに属する問題のビットを立てたマスク（採点用）
+
+    def grade(self, question_id: int, selected: Optional[List[str]]) -> Optional[bool]:
+        """正誤判定（この試験の問題でない場合はNone）"""
+        key = self.questions.get(question_id)
+        if key is None:
+            return None
+        return frozenset(selected or []) == key.correct
+
+    def correct_mask(self, items: Iterable[Tuple[int, Optional[bool]]]) -> int:
+        """(question_id, is_correct) の列から正解ビットマスクを作成（この試験にない問題は無視）"""
+        mask = 0
+        for question_id, is_correct in items:
+            if is_correct:
+                key = self.questions.get(question_id)
+                if key is not None:
+                    mask |= key.bit
+        return mask
+
+
+def _section_query(exam_id: int):
+    return (
+        select(Section.id, Section.title, Section.weight)
+        .where(Section.exam_id == exam_id)
+        .order_by(Section.id)
+    )
+
+
+def _question_query(exam_id: int):
+    return (
+        select(Question.id, Question.section_id, Question.answer, Question.explanation_text)
+        .join(Section, Question.section_id == Section.id)
+        .where(Section.exam_id == exam_id)
+        .order_by(Section.id, Question.order, Question.id)
+    )
+
+
+def build_answer_key(section_rows, question_rows) -> ExamAnswerKey:
+    """sections / questions の行から正解キーを作成"""
+    section_index = {section_id: i for i, (section_id, _, _) in enumerate(section_rows)}
+    section_weights = [weight if weight is not None else 1 for _, _, weight in section_rows]
+    section_masks = [0] * len(section_rows)
+
+    questions = {}
+    for position, (question_id, section_id, answer, explanation) in enumerate(question_rows):
+        index = section_index[section_id]
+        bit = 1 << position
+        section_masks[index] |= bit
+        questions[question_id] = QuestionKey(
+            correct=frozenset(answer),
+            answer=answer,
+            explanation=explanation,
+            section_index=index,
+            weight=section_weights[index],
+            bit=bit
+        )
+    return ExamAnswerKey(
+        questions=questions,
+        sections=[(section_id, title) for section_id, title, _ in section_rows],
+        section_weights=section_weights,
+        section_masks=section_masks
+    )
+
+
+def load_answer_key(db: Session, exam_id: int) -> ExamAnswerKey:
+    """DBから最新の正解キーを作成（キャッシュを使わない。再採点ジョブ用）"""
+    return build_answer_key(
+        db.execute(_section_query(exam_id)).all(),
+        db.execute(_question_query(exam_id)).all()
+    )
+
+
+async def get_answer_key(db: AsyncSession, exam_id: int) -> ExamAnswerKey:
+    """試験の正解キーを取得（未構築の場合はsections / questionsから作成してキャッシュ）"""
+    answer_key = answer_key_cache.get(exam_id)
+    if answer_key is not None:
+        return answer_key
+
+    version = answer_key_cache.version(exam_id)
+    answer_key = build_answer_key(
+        (await db.execute(_section_query(exam_id))).all(),
+        (await db.execute(_question_query(exam_id))).all()
+    )
+    answer_key_cache.put(exam_id, version, answer_key)
+    return answer_key
@@ -1,38 +1,48 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from datetime import datetime
 from typing import List, Optional
-from app.database import get_db
-from app.models import Attempt, AttemptItem, Exam, Question, Section
+from app.database import get_async_db, get_db
+from app.models import Attempt, AttemptItem, Exam, Section
 from app.schemas import (
     AttemptCreate, AttemptStart, AttemptSubmit, AttemptFinish,
     AttemptItemResponse, Attempt as AttemptSchema
 )
-from app.auth import get_optional_user, get_current_user
-from app.models import User
+from app.auth import AuthenticatedUser, get_optional_user, get_current_user_async
+from app.answer_buffer import answer_buffer, upsert_attempt_items
+from app.answer_key import get_answer_key
+from app.config import get_settings
+from app.exam_cache import exam_cache
+from app.scoring import ScoringRules, score_attempt
 
 router = APIRouter()
 
+settings = get_settings()
+
 @router.get("/my-history", response_model=List[AttemptSchema])
-def get_my_attempts(
+async def get_my_attempts(
     limit: int = 3,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user_async)
 ):
     """ログインユーザーの受験履歴取得"""
-    attempts = db.query(Attempt)\
-        .filter(Attempt.user_id == current_user.id)\
-        .order_by(Attempt.started_at.desc())\
-        .limit(limit)\
-        .all()
+    result = await db.execute(
+        select(Attempt)
+        .options(joinedload(Attempt.exam))
+        .where(Attempt.user_id == current_user.id)
+        .order_by(Attempt.started_at.desc())
+        .limit(limit)
+    )
     
-    return attempts
+    return result.scalars().all()
 
 @router.post("", response_model=AttemptStart, status_code=status.HTTP_201_CREATED)
 def start_attempt(
     attempt_data: AttemptCreate,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user)
+    current_user: Optional[AuthenticatedUser] = Depends(get_optional_user)
 ):
     """試験受験開始"""
     exam = db.query(Exam).filter(Exam.id == attempt_data.exam_id).first()
@@ -43,7 +53,7 @@ def start_attempt(
     if attempt_data.mode:
         exam.mode = attempt_data.mode
         db.commit()
-        db.refresh(exam)
+        exam_cache.invalidate(exam.id)  # modeは正解キーに影響しないため詳細キャッシュのみ破棄
     
     # Attemptを作成
     new_attempt = Attempt(
@@ -54,6 +64,13 @@ def start_attempt(
     db.commit()
     db.refresh(new_attempt)
     
+    # レスポンス用にセクション・問題をまとめて読み込む
+    exam = db.query(Exam)\
+        .options(selectinload(Exam.sections).selectinload(Section.questions))\
+        .populate_existing()\
+        .filter(Exam.id == new_attempt.exam_id)\
+        .first()
+    
     return {
         "attempt_id": new_attempt.id,
         "exam": exam,
@@ -61,115 +78,108 @@ def start_attempt(
     }
 
 @router.post("/{attempt_id}/answers", response_model=List[AttemptItemResponse])
-def submit_answers(
+async def submit_answers(
     attempt_id: int,
     submit_data: AttemptSubmit,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """回答送信（模擬モード用：即時フィードバック）"""
-    attempt = db.query(Attempt).filter(Attempt.id == attempt_id).first()
+    attempt = await db.get(Attempt, attempt_id)
     if not attempt:
         raise HTTPException(status_code=404, detail="Attempt not found")
     
-    exam = db.query(Exam).filter(Exam.id == attempt.exam_id).first()
+    exam = await db.get(Exam, attempt.exam_id)
+    answer_key = await get_answer_key(db, exam.id)
     
     responses = []
+    item_rows = {}  # question_id -> 書き込む行（同じ問題への重複回答は最後の回答を採用）
     
     for answer_data in submit_data.answers:
-        question = db.query(Question).filter(Question.id == answer_data.question_id).first()
-        if not question:
+        # 正誤判定（正解キーにない＝この試験の問題でない場合はスキップ）
+        is_correct = answer_key.grade(answer_data.question_id, answer_data.selected)
+        if is_correct is None:
             continue
+        question_key = answer_key.questions[answer_data.question_id]
         
-        # 正誤判定
-        is_correct = set(answer_data.selected or []) == set(question.answer)
-        
-        # AttemptItemを作成または更新
-        attempt_item = db.query(AttemptItem).filter(
-            AttemptItem.attempt_id == attempt_id,
-            AttemptItem.question_id == answer_data.question_id
-        ).first()
-        
-        if attempt_item:
-            attempt_item.selected = answer_data.selected
-            attempt_item.is_correct = is_correct
-        else:
-            attempt_item = AttemptItem(
-                attempt_id=attempt_id,
-                question_id=answer_data.question_id,
-                selected=answer_data.selected,
-                is_correct=is_correct
-            )
-            db.add(attempt_item)
+        item_rows[answer_data.question_id] = {
+            "attempt_id": attempt_id,
+            "question_id": answer_data.question_id,
+            "selected": answer_data.selected,
+            "is_correct": is_correct
+        }
         
         # 模擬モードの場合は正解と解説を返す
         response = {
-            "question_id": question.id,
+            "question_id": answer_data.question_id,
             "is_correct": is_correct,
-            "correct_answer": question.answer if exam.mode == "practice" else None,
-            "explanation": question.explanation_text if exam.mode == "practice" else None
+            "correct_answer": question_key.answer if exam.mode == "practice" else None,
+            "explanation": question_key.explanation if exam.mode == "practice" else None
         }
         responses.append(response)
     
-    db.commit()
+    # AttemptItemを一括で作成または更新（write-behind有効時はバッファに積んで後でまとめて書き込む）
+    if item_rows:
+        if settings.answer_write_behind:
+            answer_buffer.add(attempt_id, list(item_rows.values()))
+        else:
+            await upsert_attempt_items(db, list(item_rows.values()))
+            await db.commit()
+    
     return responses
 
 @router.post("/{attempt_id}/finish", response_model=AttemptFinish)
-def finish_attempt(
+async def finish_attempt(
     attempt_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """試験終了・採点"""
-    attempt = db.query(Attempt).filter(Attempt.id == attempt_id).first()
+    attempt = await db.get(Attempt, attempt_id)
     if not attempt:
         raise HTTPException(status_code=404, detail="Attempt not found")
     
     if attempt.ended_at:
         raise HTTPException(status_code=400, detail="Attempt already finished")
     
-    # スコア計算
-    items = db.query(AttemptItem).filter(AttemptItem.attempt_id == attempt_id).all()
-    total_questions = len(items)
-    correct_count = sum(1 for item in items if item.is_correct)
-    score = int((correct_count / total_questions * 100)) if total_questions > 0 else 0
-    
-    # セクション別スコア
-    exam = db.query(Exam).filter(Exam.id == attempt.exam_id).first()
-    section_scores = {}
-    
-    for section in exam.sections:
-        section_items = [item for item in items if any(q.id == item.question_id for q in section.questions)]
-        section_total = len(section_items)
-        section_correct = sum(1 for item in section_items if item.is_correct)
-        section_scores[section.title] = {
-            "correct": section_correct,
-            "total": section_total,
-            "percentage": int((section_correct / section_total * 100)) if section_total > 0 else 0
-        }
+    # 未書き込みの回答を反映してから採点する
+    if settings.answer_write_behind:
+        await answer_buffer.flush(attempt_id)
+    
+    # 採点（回答の正誤からビットマスクを作り、セクションの重み・基準点を考慮して得点化）
+    exam = await db.get(Exam, attempt.exam_id)
+    answer_key = await get_answer_key(db, exam.id)
+    item_rows = (await db.execute(
+        select(AttemptItem.question_id, AttemptItem.is_correct)
+        .where(AttemptItem.attempt_id == attempt_id)
+    )).all()
+    result = score_attempt(answer_key, answer_key.correct_mask(item_rows), ScoringRules.from_config(exam.config))
     
     # Attempt更新
     attempt.ended_at = datetime.utcnow()
-    attempt.score = score
-    attempt.total_score = score
-    attempt.is_passed = score >= exam.config.get("pass_threshold", 60) if exam.config else None
-    attempt.raw_result = {"section_scores": section_scores}
+    attempt.score = result.score
+    attempt.total_score = result.score
+    attempt.is_passed = result.is_passed
+    attempt.raw_result = {"section_scores": result.section_scores}
     
-    db.commit()
+    await db.commit()
     
     return {
-        "score": score,
-        "total_questions": total_questions,
-        "section_scores": section_scores,
-        "is_passed": score >= exam.config.get("pass_threshold", 60) if exam.config else None
+        "score": result.score,
+        "total_questions": result.total_questions,
+        "section_scores": result.section_scores,
+        "is_passed": result.is_passed
     }
 
 @router.get("/{attempt_id}", response_model=AttemptSchema)
 def get_attempt(
     attempt_id: int,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user)
+    current_user: Optional[AuthenticatedUser] = Depends(get_optional_user)
 ):
     """試験結果取得"""
-    attempt = db.query(Attempt).filter(Attempt.id == attempt_id).first()
+    attempt = db.query(Attempt)\
+        .options(joinedload(Attempt.exam))\
+        .filter(Attempt.id == attempt_id)\
+        .first()
     if not attempt:
         raise HTTPException(status_code=404, detail="Attempt not found")
     
@@ -1,19 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from typing import Optional
 from app.database import get_db
 from app.models import User
 from app.schemas import UserCreate, User as UserSchema, Token
-from app.auth import get_password_hash, verify_password, create_access_token, get_current_user
+from app.auth import (
+    AuthenticatedUser, hash_password, verify_and_update_password, create_access_token, get_current_user,
+    get_token_version, invalidate_user
+)
 from app.config import get_settings
 
 router = APIRouter()
 settings = get_settings()
 
-@router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    """ユーザー登録"""
+def _check_user_available(db: Session, user_data: UserCreate):
     # ユーザー名の重複チェック
     existing_user = db.query(User).filter(User.username == user_data.username).first()
     if existing_user:
@@ -30,9 +33,8 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
-    
-    # 新規ユーザー作成
-    hashed_password = get_password_hash(user_data.password)
+
+def _create_user(db: Session, user_data: UserCreate, hashed_password: str) -> User:
     new_user = User(
         username=user_data.username,
         email=user_data.email if user_data.email else None,
@@ -45,25 +47,51 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     db.refresh(new_user)
     return new_user
 
+def _get_user_by_username(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+def _update_password_hash(db: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+    db.refresh(user)
+    invalidate_user(user.id)
+
+@router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+    """ユーザー登録（DB処理はスレッドプール、ハッシュ化はパスワード専用スレッドで実行）"""
+    await run_in_threadpool(_check_user_available, db, user_data)
+    
+    # 新規ユーザー作成
+    hashed_password = await hash_password(user_data.password)
+    return await run_in_threadpool(_create_user, db, user_data, hashed_password)
+
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """ログイン"""
     # usernameでログイン
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_in_threadpool(_get_user_by_username, db, form_data.username)
+    verified = False
+    if user:
+        verified, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # bcryptのコスト設定が変わっていれば新しいコストで保存し直す
+    if new_hash:
+        await run_in_threadpool(_update_password_hash, db, user, new_hash)
+    
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id, "ver": get_token_version(user)},
+        expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserSchema)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: AuthenticatedUser = Depends(get_current_user)):
     """現在のユーザー情報取得"""
     return current_user
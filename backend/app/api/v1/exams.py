@@ -1,76 +1,172 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
+from sqlalchemy import and_, func, insert, or_, select, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from datetime import datetime
 from typing import List, Optional
-from app.database import get_db
-from app.models import Exam, Section, Question, User
+import base64
+import json
+import logging
+import time
+from app.database import get_async_db, get_db
+from app.models import Exam, Section, Question
 from app.schemas import (
-    ExamCreate, ExamUpdate, ExamList, Exam as ExamSchema, ExamWithAnswers,
-    SectionCreate, QuestionCreate
+    ExamCreate, ExamImport, ExamUpdate, ExamList, Exam as ExamSchema, ExamWithAnswers,
+    SectionCreate, QuestionCreate, ParsedQuestion
 )
-from app.auth import get_current_user, get_optional_user
+from app.answer_buffer import answer_buffer
+from app.auth import (
+    AuthenticatedUser, get_current_user, get_current_user_async, get_optional_user, get_optional_user_async
+)
+from app.exam_cache import CachedExam, exam_cache, invalidate_exam
+from app.metrics import time_stage
+from app.regrade import REGRADE_FAILED, regrade_status, run_regrade_job
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _encode_cursor(exam: Exam) -> str:
+    """一覧の続きを取得するためのカーソル（created_at, id）を作成"""
+    raw = json.dumps({"created_at": exam.created_at.isoformat(), "id": exam.id})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(data["created_at"]), int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("", response_model=List[ExamList])
 def get_exams(
+    response: Response,
     level: Optional[str] = None,
     type: Optional[str] = None,
     is_public: Optional[bool] = None,
+    mine: bool = False,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user)
+    current_user: Optional[AuthenticatedUser] = Depends(get_optional_user)
 ):
-    """試験一覧取得"""
-    query = db.query(Exam)
+    """試験一覧取得（新しい順・カーソルページネーション）
     
+    次ページのカーソルは X-Next-Cursor ヘッダー、include_total=true の場合の
+    総件数は X-Total-Count ヘッダーで返す。mine=true の場合は自分が作成した試験のみ。
+    """
+    # 共通の絞り込み条件
+    conditions = []
+    if mine:
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        conditions.append(Exam.creator_id == current_user.id)
     if level:
-        query = query.filter(Exam.level == level)
+        conditions.append(Exam.level == level)
     if type:
-        query = query.filter(Exam.type == type)
+        conditions.append(Exam.type == type)
+    
+    # 公開範囲ごとの条件。ORのままだとインデックス順に読めず全件をソートするため、
+    # 複数ある場合はそれぞれをインデックス順に limit+1 件まで読んでからまとめる
     if is_public is not None:
-        query = query.filter(Exam.is_public == is_public)
+        branches = [[Exam.is_public == is_public]]
+    elif current_user and not mine:
+        # ログインしている場合は、公開試験 + 自分が作成した非公開試験を表示
+        branches = [
+            [Exam.is_public == True],
+            [Exam.creator_id == current_user.id, Exam.is_public == False]
+        ]
+    elif current_user:
+        branches = [[]]
     else:
-        # ログインしている場合は、公開試験 OR 自分が作成した試験を表示
-        if current_user:
-            from sqlalchemy import or_
-            query = query.filter(
-                or_(
-                    Exam.is_public == True,
-                    Exam.creator_id == current_user.id
-                )
+        # 未ログインの場合は公開試験のみ
+        branches = [[Exam.is_public == True]]
+    
+    # 総件数（テーブル走査を避けたい場合は include_total=false のまま）
+    if include_total:
+        total = db.query(func.count(Exam.id)).filter(
+            *conditions, or_(*[and_(true(), *branch) for branch in branches])
+        ).scalar()
+        response.headers["X-Total-Count"] = str(total)
+    
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        # DBに保存された値と比較する（SQLiteでは日時の文字列表現が異なるため）
+        last_created_at = func.coalesce(
+            select(Exam.created_at).where(Exam.id == cursor_id).scalar_subquery(),
+            cursor_created_at
+        )
+        conditions.append(
+            or_(
+                Exam.created_at < last_created_at,
+                and_(Exam.created_at == last_created_at, Exam.id < cursor_id)
             )
-        else:
-            # 未ログインの場合は公開試験のみ
-            query = query.filter(Exam.is_public == True)
+        )
+    
+    order = (Exam.created_at.desc(), Exam.id.desc())
+    query = db.query(Exam)
+    if len(branches) == 1:
+        query = query.filter(*conditions, *branches[0])
+    else:
+        pages = [
+            select(Exam.id).where(*conditions, *branch).order_by(*order).limit(limit + 1).subquery()
+            for branch in branches
+        ]
+        query = query.filter(Exam.id.in_(union_all(*[select(page.c.id) for page in pages])))
+    
+    exams = query.order_by(*order).limit(limit + 1).all()
+    
+    if len(exams) > limit:
+        exams = exams[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(exams[-1])
     
-    exams = query.all()
     return exams
 
 @router.get("/{exam_id}", response_model=ExamSchema)
-def get_exam(
+async def get_exam(
     exam_id: int,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[AuthenticatedUser] = Depends(get_optional_user_async)
 ):
     """試験詳細取得（正解は含まない）"""
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
-    if not exam:
-        raise HTTPException(status_code=404, detail="Exam not found")
+    cached = exam_cache.get(exam_id)
+    if cached is None:
+        version = exam_cache.version(exam_id)
+        result = await db.execute(
+            select(Exam)
+            .options(selectinload(Exam.sections).selectinload(Section.questions))
+            .where(Exam.id == exam_id)
+        )
+        exam = result.scalars().first()
+        if not exam:
+            raise HTTPException(status_code=404, detail="Exam not found")
+        
+        cached = CachedExam(
+            payload=ExamSchema.model_validate(exam).model_dump_json().encode("utf-8"),
+            is_public=exam.is_public,
+            creator_id=exam.creator_id
+        )
+        exam_cache.put(exam_id, version, cached)
     
     # 非公開試験の場合は作成者のみアクセス可能
-    if not exam.is_public:
-        if not current_user or exam.creator_id != current_user.id:
+    if not cached.is_public:
+        if not current_user or cached.creator_id != current_user.id:
             raise HTTPException(status_code=403, detail="この試験は非公開です")
     
-    return exam
+    return Response(content=cached.payload, media_type="application/json")
 
 @router.get("/{exam_id}/with-answers", response_model=ExamWithAnswers)
 def get_exam_with_answers(
     exam_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """試験詳細取得（正解を含む）- 作成者のみ"""
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = db.query(Exam)\
+        .options(selectinload(Exam.sections).selectinload(Section.questions))\
+        .filter(Exam.id == exam_id)\
+        .first()
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
     
@@ -84,7 +180,7 @@ def get_exam_with_answers(
 def create_exam(
     exam_data: ExamCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """試験作成"""
     new_exam = Exam(
@@ -101,12 +197,85 @@ def create_exam(
     db.refresh(new_exam)
     return new_exam
 
+def _parsed_question_row(parsed: ParsedQuestion, order: int) -> dict:
+    """解析結果の1問を問題行に変換（選択肢番号の正解を選択肢テキストに変換し、空の選択肢を除く）"""
+    choices = parsed.choices or []
+    answer = []
+    for answer_num in parsed.answer:
+        index = int(answer_num) - 1 if answer_num.isdigit() else -1
+        if 0 <= index < len(choices) and choices[index]:
+            answer.append(choices[index])
+    return {
+        "order": order,
+        "type": parsed.type,
+        "prompt_text": parsed.prompt_text,
+        "choices": [choice for choice in choices if choice.strip()],
+        "answer": answer,
+        "explanation_text": parsed.explanation_text,
+        "question_metadata": parsed.metadata or {}
+    }
+
+@router.post("/import", response_model=ExamSchema, status_code=status.HTTP_201_CREATED)
+def import_exam(
+    exam_data: ExamImport,
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """試験をセクション・問題ごと一括登録（1トランザクション、セクション・問題はまとめてINSERT）"""
+    with time_stage("db_write"):
+        new_exam = Exam(
+            title=exam_data.title,
+            level=exam_data.level,
+            type=exam_data.type,
+            mode=exam_data.mode,
+            creator_id=current_user.id,
+            is_public=exam_data.is_public,
+            config=exam_data.config
+        )
+        db.add(new_exam)
+        db.flush()
+        
+        sections = exam_data.sections
+        section_ids = []
+        if sections:
+            section_ids = db.scalars(
+                insert(Section).returning(Section.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "exam_id": new_exam.id,
+                        "title": section.title,
+                        "order": section.order,
+                        "time_limit_seconds": section.time_limit_seconds,
+                        "weight": section.weight
+                    }
+                    for section in sections
+                ]
+            ).all()
+        
+        question_rows = []
+        for section, section_id in zip(sections, section_ids):
+            for question in section.questions:
+                question_rows.append({**question.dict(), "section_id": section_id})
+            start = len(section.questions)
+            for i, parsed in enumerate(section.parsed_questions):
+                question_rows.append({**_parsed_question_row(parsed, start + i + 1), "section_id": section_id})
+        if question_rows:
+            db.execute(insert(Question), question_rows)
+        
+        db.commit()
+    
+    return db.query(Exam)\
+        .options(selectinload(Exam.sections).selectinload(Section.questions))\
+        .populate_existing()\
+        .filter(Exam.id == new_exam.id)\
+        .first()
+
 @router.put("/{exam_id}", response_model=ExamSchema)
 def update_exam(
     exam_id: int,
     exam_data: ExamUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """試験更新"""
     exam = db.query(Exam).filter(Exam.id == exam_id).first()
@@ -124,6 +293,7 @@ def update_exam(
         exam.config = exam_data.config
     
     db.commit()
+    invalidate_exam(exam_id)
     db.refresh(exam)
     return exam
 
@@ -131,7 +301,7 @@ def update_exam(
 def delete_exam(
     exam_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """試験削除（受験履歴も含めて削除）"""
     exam = db.query(Exam).filter(Exam.id == exam_id).first()
@@ -143,14 +313,62 @@ def delete_exam(
     
     db.delete(exam)
     db.commit()
+    invalidate_exam(exam_id)
     return None
 
+@router.post("/{exam_id}/regrade", status_code=status.HTTP_202_ACCEPTED)
+async def start_regrade(
+    exam_id: int,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user_async)
+):
+    """全受験の再採点を開始（正解修正・採点ルール変更後に実行。進捗はGETで取得）"""
+    exam = await db.get(Exam, exam_id)
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    
+    if exam.creator_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if not regrade_status.start(exam_id):
+        raise HTTPException(status_code=409, detail="Regrade already running")
+    
+    # バッファ中の回答も再採点の対象にする（失敗時は実行中のまま残さない）
+    try:
+        await answer_buffer.flush()
+    except Exception as e:
+        logger.exception("再採点前の回答書き込みエラー exam=%s", exam_id)
+        regrade_status.update(exam_id, status=REGRADE_FAILED, finished_at=time.time(), error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to flush buffered answers")
+    background_tasks.add_task(run_regrade_job, exam_id)
+    return regrade_status.get(exam_id)
+
+@router.get("/{exam_id}/regrade")
+async def get_regrade_status(
+    exam_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user_async)
+):
+    """再採点の進捗取得"""
+    exam = await db.get(Exam, exam_id)
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    
+    if exam.creator_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    regrade = regrade_status.get(exam_id)
+    if not regrade:
+        raise HTTPException(status_code=404, detail="Regrade not found")
+    return regrade
+
 @router.post("/{exam_id}/sections", status_code=status.HTTP_201_CREATED)
 def create_section(
     exam_id: int,
     section_data: SectionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """セクション作成"""
     exam = db.query(Exam).filter(Exam.id == exam_id).first()
@@ -167,6 +385,7 @@ def create_section(
     new_section = Section(**section_dict)
     db.add(new_section)
     db.commit()
+    invalidate_exam(exam_id)
     db.refresh(new_section)
     return new_section
 
@@ -176,7 +395,7 @@ def create_question(
     section_id: int,
     question_data: QuestionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """問題作成"""
     # 試験とセクションの存在確認
@@ -200,6 +419,8 @@ def create_question(
     
     new_question = Question(**question_dict)
     db.add(new_question)
-    db.commit()
+    with time_stage("db_write"):
+        db.commit()
+    invalidate_exam(exam_id)
     db.refresh(new_question)
     return new_question
@@ -1,111 +1,153 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, AsyncIterator, BinaryIO, Iterator, List, Tuple
+import asyncio
+import hashlib
+import json
+import logging
 import os
-import io
 import tempfile
+import time
+import uuid
 from app.database import get_db
-from app.models import User
-from app.auth import get_current_user
-from app.pdf_parser import PDFParser
+from app.auth import AuthenticatedUser, get_current_user
+from app.pdf_parser import PARSER_VERSION, PDFParser, get_pdf_executor
 from app.text_parser import TextParser
+from app.ocr import (
+    OCR_CACHE_PARAMS, check_ocr_available, count_pdf_pages, get_ocr_executor, ocr_image_file, ocr_pdf_page
+)
+from app.ocr_jobs import JOB_COMPLETED, JOB_FAILED, JOB_QUEUED, combine_pages, job_store, run_ocr_job
+from app.metrics import import_stage_seconds, run_timed, time_stage
+from app.upload_cache import upload_cache
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/ocr")
-async def ocr_pdf(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """PDF/画像をOCR処理してテキスト抽出（編集可能な形式で返す）"""
-    
-    print(f"\n=== OCR Processing Started ===")
-    print(f"Filename: {file.filename}")
-    
+OCR_ALLOWED_EXTENSIONS = ['.pdf', '.png', '.jpg', '.jpeg']
+MAX_UPLOAD_MB = 10  # PDF・画像アップロードのサイズ上限
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 一時ファイルへコピーする単位
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+OCR_STREAM_POLL_SECONDS = 0.5  # OCRジョブのストリームでページの完了を確認する間隔
+STREAM_HEARTBEAT_SECONDS = 15  # イベントがない間に進捗を送る間隔（プロキシのアイドルタイムアウト対策）
+
+def _copy_upload_to_temp_file(source: BinaryIO, suffix: str, max_bytes: int) -> Tuple[str, str]:
+    """アップロードをチャンク単位で一時ファイルにコピーしながらSHA-256を計算（上限を超えた時点で中断）"""
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        try:
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"ファイルサイズは{max_bytes // (1024 * 1024)}MB以下にしてください"
+                    )
+                digest.update(chunk)
+                tmp_file.write(chunk)
+        except BaseException:
+            tmp_file.close()
+            os.remove(tmp_file.name)
+            raise
+    logger.info("File size: %.2fMB", size / (1024 * 1024))
+    return tmp_file.name, digest.hexdigest()
+
+async def _save_upload(file: UploadFile, max_mb: int) -> Tuple[str, str]:
+    """アップロードを一時ファイルに保存（パスと内容のSHA-256を返す）
+
+    全体をメモリに読み込まず、multipart解析時のスプールファイルから順にコピーする。
+    ボディ全体の大きさはUploadSizeLimitMiddlewareが受信中に制限するため、ここではファイル単体の上限を確認する。
+    ワーカープロセスがパスで開くため、一時ファイルは呼び出し側で削除する。
+    """
+    max_bytes = max_mb * 1024 * 1024
+    # multipart解析時にサイズが分かっていれば、コピーする前に拒否
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=400, detail=f"ファイルサイズは{max_mb}MB以下にしてください")
+    suffix = os.path.splitext(file.filename)[1]
+    return await run_in_threadpool(_copy_upload_to_temp_file, file.file, suffix, max_bytes)
+
+def _check_ocr_upload(file: UploadFile) -> bool:
+    """OCR対象ファイルを検証（PDFかどうかを返す）"""
     # ファイルタイプチェック
-    allowed_extensions = ['.pdf', '.png', '.jpg', '.jpeg']
-    if not any(file.filename.lower().endswith(ext) for ext in allowed_extensions):
+    if not any(file.filename.lower().endswith(ext) for ext in OCR_ALLOWED_EXTENSIONS):
         raise HTTPException(
             status_code=400, 
             detail="PDF、PNG、JPEGファイルのみアップロード可能です"
         )
     
-    # ファイル内容を読み取り
-    content = await file.read()
-    file_size_mb = len(content) / (1024 * 1024)
-    print(f"File size: {file_size_mb:.2f}MB")
+    try:
+        check_ocr_available()
+    except ImportError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"OCR機能が利用できません: {str(e)}"
+        )
+    
+    return file.filename.lower().endswith('.pdf')
+
+def _count_ocr_pages(tmp_path: str, is_pdf: bool) -> int:
+    try:
+        return count_pdf_pages(tmp_path) if is_pdf else 1
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"PDF処理エラー: {str(e)}")
+
+@router.post("/ocr")
+async def ocr_pdf(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """PDF/画像をOCR処理してテキスト抽出（編集可能な形式で返す）
     
-    if file_size_mb > 10:
-        raise HTTPException(status_code=400, detail="ファイルサイズは10MB以下にしてください")
+    PDFは埋め込みテキストをそのまま使い、テキストのない画像部分だけをOCRする。
+    OCRはプロセスプールで実行するため、処理中もイベントループはブロックされない。
+    大きなファイルは /ocr/jobs で非同期ジョブとして処理できる。
+    """
     
-    # 一時ファイルに保存
-    suffix = os.path.splitext(file.filename)[1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-        tmp_file.write(content)
-        tmp_path = tmp_file.name
+    logger.info("OCR processing started: %s", file.filename)
     
-    print(f"Temp file created: {tmp_path}")
+    is_pdf = _check_ocr_upload(file)
+    tmp_path, content_hash = await _save_upload(file, MAX_UPLOAD_MB)
     
     try:
-        # OCR処理
-        try:
-            import pytesseract
-            from PIL import Image
-            import fitz  # PyMuPDF
-            import platform
-            
-            # Windows用のみTesseractのパスを設定（Linux/Dockerでは不要）
-            if platform.system() == 'Windows':
-                pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        except ImportError as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"OCR機能が利用できません: {str(e)}"
-            )
+        # 同じファイル・同じOCR設定の結果があればそれを返す
+        cache_key = upload_cache.make_key("ocr", content_hash, OCR_CACHE_PARAMS)
+        cached = await run_in_threadpool(upload_cache.get, cache_key)
+        if cached is not None:
+            logger.info("OCR cache hit: %s", file.filename)
+            return {
+                "success": True,
+                "extracted_text": cached["extracted_text"],
+                "message": "OCR処理が完了しました。テキストを確認・編集してください。"
+            }
         
-        print("Starting OCR processing...")
-        extracted_text = ""
+        total_pages = _count_ocr_pages(tmp_path, is_pdf)
+        logger.debug("Temp file created: %s (%d pages)", tmp_path, total_pages)
         
-        if file.filename.lower().endswith('.pdf'):
-            # PDFをPyMuPDFで画像に変換してOCR
-            print("Converting PDF to images using PyMuPDF...")
-            try:
-                pdf_document = fitz.open(tmp_path)
-                print(f"PDF has {len(pdf_document)} pages")
-                
-                for page_num in range(len(pdf_document)):
-                    print(f"OCR processing page {page_num+1}/{len(pdf_document)}...")
-                    page = pdf_document[page_num]
-                    
-                    # ページを画像に変換（高解像度）
-                    zoom = 2.0  # 解像度を上げる
-                    mat = fitz.Matrix(zoom, zoom)
-                    pix = page.get_pixmap(matrix=mat)
-                    
-                    # PILイメージに変換
-                    img_data = pix.tobytes("png")
-                    image = Image.open(io.BytesIO(img_data))
-                    
-                    # 日本語OCR（jpn）
-                    page_text = pytesseract.image_to_string(image, lang='jpn')
-                    extracted_text += page_text + "\n\n"
-                
-                pdf_document.close()
-            except Exception as e:
-                print(f"PDF processing error: {e}")
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"PDF処理エラー: {str(e)}"
-                )
+        loop = asyncio.get_running_loop()
+        executor = get_ocr_executor()
+        if is_pdf:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(executor, run_timed, ocr_pdf_page, tmp_path, page_num)
+                for page_num in range(total_pages)
+            ))
         else:
-            # 画像ファイルを直接OCR
-            print("OCR processing image...")
-            image = Image.open(tmp_path)
-            extracted_text = pytesseract.image_to_string(image, lang='jpn')
+            results = [await loop.run_in_executor(executor, run_timed, ocr_image_file, tmp_path)]
         
-        print(f"Extracted {len(extracted_text)} characters")
-        print("=== OCR Processing Completed ===\n")
+        for _, seconds in results:
+            import_stage_seconds.observe("ocr_page", seconds)
+        extracted_text = combine_pages([
+            {"page": page_num, "text": text} for page_num, (text, _) in enumerate(results)
+        ]) if is_pdf else results[0][0]
+        
+        logger.info("OCR processing completed: %s (%d characters)", file.filename, len(extracted_text))
+        await run_in_threadpool(upload_cache.put, cache_key, {
+            "pages": [text for text, _ in results],
+            "extracted_text": extracted_text
+        })
         
         return {
             "success": True,
@@ -116,9 +158,7 @@ async def ocr_pdf(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
-        print(f"OCR処理エラー: {error_detail}")
+        logger.exception("OCR処理エラー: %s", file.filename)
         raise HTTPException(status_code=500, detail=f"OCR処理エラー: {str(e)}")
     
     finally:
@@ -126,62 +166,228 @@ async def ocr_pdf(
         if os.path.exists(tmp_path):
             os.remove(tmp_path)
 
+@router.post("/ocr/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_ocr_job(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """OCRジョブ登録（ジョブIDをすぐに返し、ページ単位で並列にOCRする）"""
+    is_pdf = _check_ocr_upload(file)
+    tmp_path, content_hash = await _save_upload(file, MAX_UPLOAD_MB)
+    job_id = uuid.uuid4().hex
+    
+    # キャッシュにあれば完了済みのジョブとして登録
+    cache_key = upload_cache.make_key("ocr", content_hash, OCR_CACHE_PARAMS)
+    try:
+        cached = await run_in_threadpool(upload_cache.get, cache_key)
+        total_pages = _count_ocr_pages(tmp_path, is_pdf) if cached is None else len(cached["pages"])
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    if cached is not None:
+        os.remove(tmp_path)
+        logger.info("OCR cache hit: %s", file.filename)
+        job_store.create(job_id, current_user.id, file.filename, total_pages)
+        for page_num, text in enumerate(cached["pages"]):
+            job_store.save_page(job_id, page_num, text)
+        job_store.set_status(job_id, JOB_COMPLETED)
+        return {"job_id": job_id, "status": JOB_COMPLETED, "total_pages": total_pages}
+    
+    # 一時ファイルはジョブ終了時に削除される
+    job_store.create(job_id, current_user.id, file.filename, total_pages)
+    background_tasks.add_task(run_ocr_job, job_id, tmp_path, is_pdf, total_pages, cache_key)
+    
+    return {"job_id": job_id, "status": JOB_QUEUED, "total_pages": total_pages}
+
+@router.get("/ocr/jobs/{job_id}")
+def get_ocr_job(
+    job_id: str,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """OCRジョブの進捗とページごとの結果を取得"""
+    job = job_store.get(job_id)
+    if not job or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="OCR job not found")
+    
+    return {
+        "job_id": job["job_id"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "total_pages": job["total_pages"],
+        "completed_pages": job["completed_pages"],
+        "pages": job["pages"],
+        "extracted_text": combine_pages(job["pages"]) if job["status"] == JOB_COMPLETED else None,
+        "error": job["error"]
+    }
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+async def _ocr_job_stream(job_id: str) -> AsyncIterator[str]:
+    """OCRジョブの完了したページを順にNDJSONで返す（ジョブの保存先をポーリング）"""
+    sent_pages = set()
+    last_event = time.monotonic()
+    while True:
+        job = await run_in_threadpool(job_store.get, job_id)
+        if job is None:
+            yield _ndjson({"type": "error", "detail": "OCR job not found"})
+            return
+        
+        for page in job["pages"]:
+            if page["page"] in sent_pages:
+                continue
+            sent_pages.add(page["page"])
+            last_event = time.monotonic()
+            yield _ndjson({
+                "type": "page",
+                "page": page["page"],
+                "text": page["text"],
+                "completed_pages": len(sent_pages),
+                "total_pages": job["total_pages"]
+            })
+        
+        if job["status"] == JOB_COMPLETED:
+            yield _ndjson({"type": "done", "extracted_text": combine_pages(job["pages"])})
+            return
+        if job["status"] == JOB_FAILED:
+            yield _ndjson({"type": "error", "detail": f"OCR処理エラー: {job['error']}"})
+            return
+        
+        # ページの完了に時間がかかる間も接続を切られないよう、定期的に進捗を送る
+        if time.monotonic() - last_event >= STREAM_HEARTBEAT_SECONDS:
+            last_event = time.monotonic()
+            yield _ndjson({
+                "type": "progress",
+                "status": job["status"],
+                "completed_pages": len(sent_pages),
+                "total_pages": job["total_pages"]
+            })
+        await asyncio.sleep(OCR_STREAM_POLL_SECONDS)
+
+@router.get("/ocr/jobs/{job_id}/stream")
+def stream_ocr_job(
+    job_id: str,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """OCRジョブの結果をページが完了するたびにNDJSONで返す
+    
+    1行1イベントのJSON:
+      {"type": "page", "page": n, "text": "...", "completed_pages": k, "total_pages": N}
+      {"type": "progress", "status": "...", "completed_pages": k, "total_pages": N}（一定時間ページが完了しない場合）
+      {"type": "done", "extracted_text": "..."}
+      {"type": "error", "detail": "..."}
+    """
+    job = job_store.get(job_id)
+    if not job or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="OCR job not found")
+    
+    return StreamingResponse(_ocr_job_stream(job_id), media_type=NDJSON_MEDIA_TYPE)
+
+def _iter_extract_and_parse_pdf(pdf_path: str, pages: List[str]) -> Iterator[Tuple[str, Any]]:
+    """PDFのページ抽出と問題解析を並行して行い、進捗を発生順に返す（抽出済みのページから順に解析）
+
+    ("page", 抽出済みページ数) と ("question", 問題の辞書) を返し、抽出したページのテキストは pages に追加する。
+    """
+    parser = PDFParser()
+    # ページ数が多い場合はワーカープロセスにページ範囲単位で分散して抽出
+    page_iter = parser.iter_pages(pdf_path, executor=get_pdf_executor())
+    extract_seconds = 0.0
+    paused_seconds = 0.0
+    
+    def collect_pages():
+        nonlocal extract_seconds
+        while True:
+            start = time.perf_counter()
+            page_text = next(page_iter, None)
+            extract_seconds += time.perf_counter() - start
+            if page_text is None:
+                return
+            pages.append(page_text)
+            yield page_text
+    
+    reported_pages = 0
+    
+    def progress(question=None):
+        nonlocal reported_pages
+        # 問題の区切りまでに抽出されたページの進捗を先に返す
+        while reported_pages < len(pages):
+            reported_pages += 1
+            yield "page", reported_pages
+        if question is not None:
+            yield "question", question
+    
+    # 抽出と解析が交互に進むため、抽出にかかった時間と呼び出し側の処理時間を差し引いて解析時間とする
+    start = time.perf_counter()
+    for question in parser.parse_pages(collect_pages()):
+        paused_start = time.perf_counter()
+        yield from progress(question)
+        paused_seconds += time.perf_counter() - paused_start
+    total_seconds = time.perf_counter() - start
+    import_stage_seconds.observe("extract", extract_seconds)
+    import_stage_seconds.observe("parse", total_seconds - extract_seconds - paused_seconds)
+    yield from progress()
+
+def _extract_and_parse_pdf(pdf_path: str) -> Tuple[str, List[dict]]:
+    """PDFのページ抽出と問題解析を行い、(抽出テキスト, 問題一覧) を返す"""
+    pages = []
+    questions = [value for kind, value in _iter_extract_and_parse_pdf(pdf_path, pages) if kind == "question"]
+    return "".join(page_text + "\n" for page_text in pages), questions
+
+def _upload_pdf_response(extracted_text: str, questions: List[dict]) -> dict:
+    return {
+        "success": True,
+        "questions": questions,
+        "extracted_text_preview": extracted_text[:1000],  # デバッグ用：最初の1000文字
+        "message": f"{len(questions)}個の問題を抽出しました。確認・修正してください。"
+    }
+
 @router.post("/upload")
 async def upload_pdf(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """PDFアップロード＆解析"""
     
-    print(f"\n=== PDF Upload Started ===")
-    print(f"Filename: {file.filename}")
+    logger.info("PDF upload started: %s", file.filename)
     
     # ファイルタイプチェック
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
-    # ファイルサイズチェック（10MB制限）
-    content = await file.read()
-    file_size_mb = len(content) / (1024 * 1024)
-    print(f"File size: {file_size_mb:.2f}MB")
-    
-    if file_size_mb > 10:
-        raise HTTPException(status_code=400, detail="ファイルサイズは10MB以下にしてください")
-    
-    # 一時ファイルに保存
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(content)
-        tmp_path = tmp_file.name
-    
-    print(f"Temp file created: {tmp_path}")
+    # 一時ファイルに保存（10MB制限）
+    tmp_path, content_hash = await _save_upload(file, MAX_UPLOAD_MB)
+    logger.debug("Temp file created: %s", tmp_path)
     
     try:
-        # PDFを解析
-        print("Starting PDF parsing...")
-        parser = PDFParser()
+        # 開けないPDFは解析エラー（500）ではなく不正なファイルとして扱う
+        await run_in_threadpool(_count_ocr_pages, tmp_path, True)
         
-        print("Extracting text...")
-        extracted_text = parser.extract_text(tmp_path)
-        print(f"Extracted {len(extracted_text)} characters")
+        # 同じファイル・同じ解析ロジックの結果があればそれを返す
+        cache_key = upload_cache.make_key("pdf", content_hash, {"parser": PARSER_VERSION})
+        cached = await run_in_threadpool(upload_cache.get, cache_key)
+        if cached is not None:
+            logger.info("PDF cache hit: %s", file.filename)
+            return _upload_pdf_response(cached["extracted_text"], cached["questions"])
         
-        print("Parsing questions...")
-        questions = parser.parse_questions(extracted_text)
-        print(f"Found {len(questions)} questions")
-        
-        print("=== PDF Upload Completed ===\n")
+        # PDFを解析（イベントループをブロックしないようスレッドプールで実行）
+        extracted_text, questions = await run_in_threadpool(_extract_and_parse_pdf, tmp_path)
+        logger.info(
+            "PDF upload completed: %s (%d characters, %d questions)",
+            file.filename, len(extracted_text), len(questions)
+        )
+        await run_in_threadpool(upload_cache.put, cache_key, {
+            "extracted_text": extracted_text,
+            "questions": questions
+        })
         
-        return {
-            "success": True,
-            "questions": questions,
-            "extracted_text_preview": extracted_text[:1000],  # デバッグ用：最初の1000文字
-            "message": f"{len(questions)}個の問題を抽出しました。確認・修正してください。"
-        }
+        return _upload_pdf_response(extracted_text, questions)
     
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
-        print(f"PDF解析エラー: {error_detail}")
+        logger.exception("PDF解析エラー: %s", file.filename)
         raise HTTPException(status_code=500, detail=f"PDF解析エラー: {str(e)}")
     
     finally:
@@ -190,16 +396,93 @@ async def upload_pdf(
             os.remove(tmp_path)
 
 
+def _pdf_import_stream(tmp_path: str, total_pages: int, cache_key: str, filename: str) -> Iterator[str]:
+    """PDF解析の進捗と問題をNDJSONで順に返す（StreamingResponseがスレッドプールで読み進める）"""
+    try:
+        yield _ndjson({"type": "start", "total_pages": total_pages})
+        
+        cached = upload_cache.get(cache_key)
+        if cached is not None:
+            logger.info("PDF cache hit: %s", filename)
+            extracted_text, questions = cached["extracted_text"], cached["questions"]
+            for question in questions:
+                yield _ndjson({"type": "question", "question": question})
+        else:
+            pages = []
+            questions = []
+            for kind, value in _iter_extract_and_parse_pdf(tmp_path, pages):
+                if kind == "page":
+                    yield _ndjson({"type": "page", "completed_pages": value, "total_pages": total_pages})
+                else:
+                    questions.append(value)
+                    yield _ndjson({"type": "question", "question": value})
+            extracted_text = "".join(page_text + "\n" for page_text in pages)
+            logger.info(
+                "PDF upload completed: %s (%d characters, %d questions)",
+                filename, len(extracted_text), len(questions)
+            )
+            upload_cache.put(cache_key, {"extracted_text": extracted_text, "questions": questions})
+        
+        yield _ndjson({
+            "type": "done",
+            "total_questions": len(questions),
+            "extracted_text_preview": extracted_text[:1000],
+            "message": f"{len(questions)}個の問題を抽出しました。確認・修正してください。"
+        })
+    
+    except Exception as e:
+        # ステータスコードは送信済みのため、エラーもイベントとして返す
+        logger.exception("PDF解析エラー: %s", filename)
+        yield _ndjson({"type": "error", "detail": f"PDF解析エラー: {str(e)}"})
+    
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+@router.post("/upload/stream")
+async def upload_pdf_stream(
+    file: UploadFile = File(...),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """PDFアップロード＆解析（ページの抽出進捗と問題を抽出した順にNDJSONで返す）
+    
+    1行1イベントのJSON:
+      {"type": "start", "total_pages": N}
+      {"type": "page", "completed_pages": n, "total_pages": N}
+      {"type": "question", "question": {...}}
+      {"type": "done", "total_questions": K, "extracted_text_preview": "...", "message": "..."}
+      {"type": "error", "detail": "..."}
+    大きなPDFでも最初のイベントがすぐに返るため、プロキシのタイムアウトにかかりにくい。
+    """
+    logger.info("PDF stream upload started: %s", file.filename)
+    
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    
+    tmp_path, content_hash = await _save_upload(file, MAX_UPLOAD_MB)
+    try:
+        # 開けないPDFはストリームを始める前にエラーにする
+        total_pages = await run_in_threadpool(_count_ocr_pages, tmp_path, True)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    
+    cache_key = upload_cache.make_key("pdf", content_hash, {"parser": PARSER_VERSION})
+    # 一時ファイルはストリームの終了時に削除される
+    return StreamingResponse(
+        _pdf_import_stream(tmp_path, total_pages, cache_key, file.filename),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
 @router.post("/upload-text")
 async def upload_text(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """テキストファイルアップロード＆解析"""
     
-    print(f"\n=== Text Upload Started ===")
-    print(f"Filename: {file.filename}")
+    logger.info("Text upload started: %s", file.filename)
     
     # ファイルタイプチェック
     if not (file.filename.endswith('.txt') or file.filename.endswith('.md')):
@@ -211,31 +494,31 @@ async def upload_text(
         
         # ファイルサイズチェック（5MB制限）
         file_size_mb = len(content) / (1024 * 1024)
-        print(f"File size: {file_size_mb:.2f}MB")
+        logger.info("File size: %.2fMB", file_size_mb)
         
         if file_size_mb > 5:
             raise HTTPException(status_code=400, detail="ファイルサイズは5MB以下にしてください")
         
         # テキストをデコード（UTF-8、失敗したらShift-JIS）
-        try:
-            text = content.decode('utf-8')
-            print("Decoded as UTF-8")
-        except UnicodeDecodeError:
+        with time_stage("decode"):
             try:
-                text = content.decode('shift-jis')
-                print("Decoded as Shift-JIS")
+                text = content.decode('utf-8')
+                logger.debug("Decoded as UTF-8")
             except UnicodeDecodeError:
-                raise HTTPException(status_code=400, detail="ファイルのエンコーディングを認識できません（UTF-8またはShift-JISを使用してください）")
-        
-        print(f"Text length: {len(text)} characters")
+                try:
+                    text = content.decode('shift-jis')
+                    logger.debug("Decoded as Shift-JIS")
+                except UnicodeDecodeError:
+                    raise HTTPException(status_code=400, detail="ファイルのエンコーディングを認識できません（UTF-8またはShift-JISを使用してください）")
         
         # テキストを解析
-        print("Parsing questions...")
         parser = TextParser()
-        questions = parser.parse_questions(text)
-        print(f"Found {len(questions)} questions")
-        
-        print("=== Text Upload Completed ===\n")
+        with time_stage("parse"):
+            questions = parser.parse_questions(text)
+        logger.info(
+            "Text upload completed: %s (%d characters, %d questions)",
+            file.filename, len(text), len(questions)
+        )
         
         return {
             "success": True,
@@ -247,7 +530,5 @@ async def upload_text(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
-        print(f"テキスト解析エラー: {error_detail}")
+        logger.exception("テキスト解析エラー: %s", file.filename)
         raise HTTPException(status_code=500, detail=f"テキスト解析エラー: {str(e)}")
@@ -1,25 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
+import threading
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import User
 from app.config import get_settings
 
 settings = get_settings()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# コストを変更すると、異なるコストのハッシュはログイン時に再ハッシュされる
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# bcryptは意図的に重いため、他のエンドポイントと共有するスレッドプールとは別に実行する
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="password-hash"
+)
+_password_pending = 0
+_password_pending_lock = threading.Lock()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def _run_password_task(func, *args):
+    """パスワード処理を専用スレッドで実行（待ちが上限を超えたら429を返す）"""
+    global _password_pending
+    with _password_pending_lock:
+        if _password_pending >= settings.password_hash_max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login requests. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        with _password_pending_lock:
+            _password_pending -= 1
+
+async def hash_password(password: str) -> str:
+    return await _run_password_task(pwd_context.hash, password)
+
+def _password_salt(hashed_password: str) -> str:
+    try:
+        return pwd_context.handler("bcrypt").from_string(hashed_password).salt
+    except ValueError:
+        return hashed_password
+
+def _verify_and_rehash(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if not pwd_context.needs_update(hashed_password):
+        return True, None
+    # ソルトを引き継ぐため、トークンのバージョンは変わらない
+    handler = pwd_context.handler("bcrypt").using(
+        salt=_password_salt(hashed_password), rounds=settings.bcrypt_rounds
+    )
+    return True, handler.hash(plain_password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """パスワードを検証し、コスト設定が変わっていれば同じソルトで作り直したハッシュも返す"""
+    return await _run_password_task(_verify_and_rehash, plain_password, hashed_password)
+
+def get_token_version(user: User) -> str:
+    """トークンのバージョン（パスワードのソルトから作る）
+
+    パスワードを変更するとソルトも変わるため変更前のトークンは無効になる。
+    コスト変更による再ハッシュではソルトを引き継ぐので、発行済みのトークンはそのまま使える。
+    """
+    return hashlib.sha256(_password_salt(user.hashed_password).encode("utf-8")).hexdigest()[:16]
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -30,38 +103,162 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """認証済みユーザー（セッションに紐付かないスナップショット）"""
+    id: int
+    username: str
+    email: Optional[str]
+    name: str
+    is_verified: bool
+    created_at: datetime
+    token_version: str
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            name=user.name,
+            is_verified=user.is_verified,
+            created_at=user.created_at,
+            token_version=get_token_version(user)
+        )
+
+class UserCache:
+    """認証ユーザーの短期キャッシュ（ユーザーID単位、TTL経過またはinvalidateで破棄）"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[int, Tuple[float, AuthenticatedUser]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[AuthenticatedUser]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            return user
+
+    def put(self, user: AuthenticatedUser) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[user.id] = (time.monotonic() + self.ttl_seconds, user)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+user_cache = UserCache(settings.auth_user_cache_ttl_seconds, settings.auth_user_cache_max_entries)
+
+def invalidate_user(user_id: int) -> None:
+    """ユーザー情報やパスワードを変更した場合に呼び出す"""
+    user_cache.invalidate(user_id)
+
+def _decode_token(token: str) -> Optional[dict]:
+    try:
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+
+def _cached_user(payload: dict) -> Optional[AuthenticatedUser]:
+    user_id = payload.get("uid")
+    if user_id is None:
+        return None
+    cached = user_cache.get(user_id)
+    if cached is not None and cached.token_version == payload.get("ver"):
+        return cached
+    return None
+
+def _user_lookup_query(payload: dict):
+    """トークンに対応するユーザーの検索クエリ（uidを含まない旧形式のトークンはusernameで検索）"""
+    if payload.get("uid") is not None:
+        return select(User).where(User.id == payload["uid"])
+    if payload.get("sub") is not None:
+        return select(User).where(User.username == payload["sub"])
+    return None
+
+def _authenticate(payload: dict, user: Optional[User]) -> Optional[AuthenticatedUser]:
+    if user is None:
+        return None
+    authenticated_user = AuthenticatedUser.from_user(user)
+    token_version = payload.get("ver")
+    if token_version is not None and token_version != authenticated_user.token_version:
+        return None
+    user_cache.put(authenticated_user)
+    return authenticated_user
+
+def _resolve_user(token: str, db: Session) -> Optional[AuthenticatedUser]:
+    """トークンからユーザーを取得（キャッシュにあればDBを参照しない）"""
+    payload = _decode_token(token)
+    if payload is None:
+        return None
+    cached = _cached_user(payload)
+    if cached is not None:
+        return cached
+    query = _user_lookup_query(payload)
+    if query is None:
+        return None
+    return _authenticate(payload, db.execute(query).scalars().first())
+
+async def _resolve_user_async(token: str, db: AsyncSession) -> Optional[AuthenticatedUser]:
+    """_resolve_user の非同期版"""
+    payload = _decode_token(token)
+    if payload is None:
+        return None
+    cached = _cached_user(payload)
+    if cached is not None:
+        return cached
+    query = _user_lookup_query(payload)
+    if query is None:
+        return None
+    return _authenticate(payload, (await db.execute(query)).scalars().first())
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> AuthenticatedUser:
+    user = _resolve_user(token, db)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> AuthenticatedUser:
+    user = await _resolve_user_async(token, db)
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+def get_current_active_user(current_user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
     return current_user
 
-def get_optional_user(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Optional[User]:
+def get_optional_user(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Optional[AuthenticatedUser]:
     """ゲストユーザーも許可する（トークンがない場合はNoneを返す）"""
     if not token:
         return None
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        user = db.query(User).filter(User.username == username).first()
-        return user
-    except JWTError:
+    return _resolve_user(token, db)
+
+async def get_optional_user_async(
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[AuthenticatedUser]:
+    """get_optional_user の非同期版"""
+    if not token:
         return None
+    return await _resolve_user_async(token, db)
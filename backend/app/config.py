@@ -3,13 +3,38 @@ from functools import lru_cache
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./mock_nihongo.db"
+    async_database_url: str = ""  # 未指定の場合はdatabase_urlから作成（aiosqlite / asyncpg）
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_recycle: int = 1800  # 秒（-1で無効）
+    db_pool_pre_ping: bool = True
+    sqlite_busy_timeout_ms: int = 5000  # ロック時に待機する時間
+    sqlite_mmap_size: int = 268435456  # 256MB
     secret_key: str = "your-secret-key-change-this"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    bcrypt_rounds: int = 12  # bcryptのコスト（変更するとログイン時に同じソルトで再ハッシュ。発行済みトークンは有効なまま）
+    password_hash_workers: int = 4  # パスワードハッシュ専用スレッド数
+    password_hash_max_pending: int = 64  # 実行待ちを含む上限（超えると429）
+    auth_user_cache_ttl_seconds: int = 60  # 認証ユーザーキャッシュの有効期間（0で無効）
+    auth_user_cache_max_entries: int = 10000
     aws_access_key_id: str = ""
     aws_secret_access_key: str = ""
     aws_region: str = "ap-northeast-1"
     s3_bucket_name: str = "mock-nihongo-pdfs"
+    log_level: str = "INFO"
+    exam_cache_max_entries: int = 256  # 試験詳細キャッシュの最大件数（0で無効）
+    answer_key_cache_max_entries: int = 1024  # 採点用の正解キーの最大件数（0で無効）
+    answer_write_behind: bool = False  # 回答をバッファしてまとめて書き込む（単一ワーカー構成向け）
+    answer_flush_interval_seconds: float = 2.0  # バッファの書き込み間隔（プロセス停止時に失われうる最大時間）
+    ocr_max_workers: int = 2  # OCRワーカープロセス数（0でCPUコア数）
+    pdf_extract_workers: int = 2  # PDFテキスト抽出のワーカープロセス数（OCRとは別）
+    ocr_engine: str = "auto"  # OCRエンジン（auto / tesserocr / pytesseract。autoはtesserocrがあれば使う）
+    ocr_job_store: str = "memory"  # OCRジョブの保存先（memory / sqlite）
+    ocr_job_db_path: str = "./ocr_jobs.db"
+    ocr_job_ttl_seconds: int = 3600  # OCRジョブ結果の保持期間
+    upload_cache_dir: str = "./upload_cache"  # PDF抽出・OCR結果のキャッシュ保存先
+    upload_cache_max_mb: int = 512  # キャッシュの合計サイズ上限（0で無効）
 
     class Config:
         env_file = ".env"
@@ -1,16 +1,64 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import get_settings
 
 settings = get_settings()
 
+is_sqlite = settings.database_url.startswith("sqlite")
+is_sqlite_memory = is_sqlite and (":memory:" in settings.database_url or "mode=memory" in settings.database_url)
+
+# インメモリSQLiteはコネクションプールを使わないため、プール設定はそれ以外に適用
+pool_options = {} if is_sqlite_memory else {
+    "pool_size": settings.db_pool_size,
+    "max_overflow": settings.db_max_overflow,
+    "pool_recycle": settings.db_pool_recycle,
+    "pool_pre_ping": settings.db_pool_pre_ping,
+}
+
 engine = create_engine(
     settings.database_url, 
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
+    connect_args={"check_same_thread": False} if is_sqlite else {},
+    **pool_options
+)
+
+def _async_database_url(database_url: str) -> URL:
+    """同期用のURLから非同期ドライバ（aiosqlite / asyncpg）のURLを作成"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+asyncpg")
+    return url
+
+# 非同期エンドポイント用（同期エンジンはその他のエンドポイントとツール用に残す）
+# aiosqlite のファイルDBは既定でNullPoolになるため、プール設定がある場合はキュープールを明示する
+async_engine = create_async_engine(
+    settings.async_database_url or _async_database_url(settings.database_url),
+    connect_args={"check_same_thread": False} if is_sqlite else {},
+    **({"poolclass": AsyncAdaptedQueuePool} if is_sqlite and pool_options else {}),
+    **pool_options
 )
 
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """SQLiteの同時書き込み対策（WALで読み書きを並行させ、ロック時は待機する）"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.close()
+
+if is_sqlite:
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -20,3 +68,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
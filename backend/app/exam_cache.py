@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class CachedExam(NamedTuple):
+    """キャッシュされた試験（正解を含まないJSONバイト列とアクセス判定用の情報）"""
+    payload: bytes
+    is_public: bool
+    creator_id: Optional[int]
+
+
+class ExamCache:
+    """試験単位のインプロセスLRUキャッシュ（試験詳細レスポンス・正解キーで使用）
+
+    試験ごとにバージョン番号を持ち、編集時にinvalidate()でバージョンを進める。
+    構築中に編集が入った場合は、古いバージョンで構築した結果を保存しない。
+    キャッシュはプロセス単位なので、複数ワーカー構成では各ワーカーが個別に保持する。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Any]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, exam_id: int) -> int:
+        with self._lock:
+            return self._versions.get(exam_id, 0)
+
+    def get(self, exam_id: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(exam_id)
+            if entry is not None:
+                self._entries.move_to_end(exam_id)
+            return entry
+
+    def put(self, exam_id: int, version: int, entry: Any) -> None:
+        """version が現在のバージョンと一致する場合のみ保存"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if self._versions.get(exam_id, 0) != version:
+                return
+            self._entries[exam_id] = entry
+            self._entries.move_to_end(exam_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, exam_id: int) -> None:
+        with self._lock:
+            self._versions[exam_id] = self._versions.get(exam_id, 0) + 1
+            self._entries.pop(exam_id, None)
+
+
+exam_cache = ExamCache(settings.exam_cache_max_entries)
+answer_key_cache = ExamCache(settings.answer_key_cache_max_entries)
+
+
+def invalidate_exam(exam_id: int) -> None:
+    """試験・セクション・問題の編集時に、試験詳細と正解キーのキャッシュを破棄"""
+    exam_cache.invalidate(exam_id)
+    answer_key_cache.invalidate(exam_id)
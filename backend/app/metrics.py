@@ -0,0 +1,75 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """ラベル1つ付きの簡易ヒストグラム（Prometheusテキスト形式で出力）"""
+
+    def __init__(self, name: str, description: str, label: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, List[float]] = {}  # ラベル値 -> [バケット毎の件数..., 合計, 件数]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, series in sorted(self._series.items()):
+                label = f'{self.label}="{label_value}"'
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series[-1]}')
+                lines.append(f"{self.name}_sum{{{label}}} {series[-2]}")
+                lines.append(f"{self.name}_count{{{label}}} {series[-1]}")
+        return lines
+
+
+# 取り込み処理（decode / extract / parse / ocr_page / db_write）の段階別処理時間
+import_stage_seconds = Histogram(
+    "import_stage_seconds",
+    "Time spent in each stage of the PDF/text import pipeline",
+    "stage"
+)
+
+HISTOGRAMS = [import_stage_seconds]
+
+
+@contextmanager
+def time_stage(stage: str):
+    """with ブロックの処理時間を import_stage_seconds に記録"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        import_stage_seconds.observe(stage, time.perf_counter() - start)
+
+
+def run_timed(func: Callable, *args) -> Tuple[object, float]:
+    """関数を実行して (結果, 処理時間) を返す（ワーカープロセス内の計測用）"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def render_metrics() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON, Text, Enum as SQLEnum
+from sqlalchemy import Column, Index, Integer, String, Boolean, DateTime, ForeignKey, JSON, Text, Enum as SQLEnum
+from sqlalchemy import delete, inspect, select
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -63,6 +64,14 @@ class User(Base):
 
 class Exam(Base):
     __tablename__ = "exams"
+    __table_args__ = (
+        # 試験一覧のフィルター＋(created_at, id) のカーソルページネーション用
+        Index("ix_exams_public_created", "is_public", "created_at", "id"),
+        Index("ix_exams_public_level_created", "is_public", "level", "created_at", "id"),
+        Index("ix_exams_public_type_created", "is_public", "type", "created_at", "id"),
+        Index("ix_exams_creator_created", "creator_id", "created_at", "id"),
+        Index("ix_exams_creator_public_created", "creator_id", "is_public", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -130,6 +139,10 @@ class Attempt(Base):
 
 class AttemptItem(Base):
     __tablename__ = "attempt_items"
+    __table_args__ = (
+        # 回答のupsertキー（1受験につき1問1行）
+        Index("ix_attempt_items_attempt_question", "attempt_id", "question_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     attempt_id = Column(Integer, ForeignKey("attempts.id"), nullable=False)
@@ -141,3 +154,24 @@ class AttemptItem(Base):
     # Relationships
     attempt = relationship("Attempt", back_populates="items")
     question = relationship("Question", back_populates="attempt_items")
+
+
+def create_missing_indexes(bind) -> None:
+    """既存のテーブルに、後から追加したインデックスを作成する（起動時に実行）
+
+    create_allは既存のテーブルにインデックスを追加しないため、古いDBではここで作成する。
+    回答のupsertキーの一意インデックスは、作成前に同じ (attempt_id, question_id) の
+    重複行を最新（idが最大）の1行だけ残して削除する。
+    """
+    existing = {index["name"] for index in inspect(bind).get_indexes(AttemptItem.__tablename__)}
+    with bind.begin() as conn:
+        if "ix_attempt_items_attempt_question" not in existing:
+            latest_ids = (
+                select(func.max(AttemptItem.id))
+                .group_by(AttemptItem.attempt_id, AttemptItem.question_id)
+                .scalar_subquery()
+            )
+            conn.execute(delete(AttemptItem).where(AttemptItem.id.not_in(latest_ids)))
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
@@ -0,0 +1,303 @@
+import importlib.util
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# ページ単位でプロセス並列にするため、Tesseract内部のOpenMPによるスレッド並列は止める
+# （libgompは読み込み時に環境変数を読むため、libtesseractを読み込む前に設定する）
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+OCR_LANG = 'jpn'  # 日本語OCR
+OCR_TEXT_LAYER_MIN_CHARS = 20  # 埋め込みテキストがこの文字数以上あるページはOCRしない
+OCR_PREVIEW_DPI = 72  # 行の高さを推定するための縮小画像の解像度（1px = 1pt）
+OCR_TARGET_LINE_PX = 24  # OCR用画像での1行の高さの目安（これに合わせてページごとにDPIを決める）
+OCR_DEFAULT_LINE_PT = 12  # 行の高さが推定できないページ（図のみなど）で使う値（144dpi相当）
+OCR_MAX_LINE_PT = 72  # これより高い文字の塊は行として扱わない
+OCR_MIN_DPI = 100
+OCR_MAX_DPI = 300
+OCR_INK_THRESHOLD = 128  # これより暗い画素を文字とみなす（0-255）
+OCR_MIN_REGION_PT = 24  # これより小さい画像（アイコン・罫線など）はOCRしない
+
+
+def _resolve_engine_name() -> str:
+    """ocr_engine設定から使うエンジン名を決める（autoはtesserocrがインストールされていれば優先）
+
+    親プロセスでlibtesseractを読み込まないよう、tesserocrはimportせずに有無だけ調べる。
+    """
+    if settings.ocr_engine == "auto":
+        return "tesserocr" if importlib.util.find_spec("tesserocr") else "pytesseract"
+    return "tesserocr" if settings.ocr_engine == "tesserocr" else "pytesseract"
+
+
+OCR_ENGINE = _resolve_engine_name()
+# 結果に影響する設定（アップロードキャッシュのキーに含める）
+OCR_CACHE_PARAMS = {
+    "engine": OCR_ENGINE,
+    "lang": OCR_LANG,
+    "text_layer_min_chars": OCR_TEXT_LAYER_MIN_CHARS,
+    "target_line_px": OCR_TARGET_LINE_PX,
+    "min_region_pt": OCR_MIN_REGION_PT,
+    "dpi": [OCR_MIN_DPI, OCR_MAX_DPI]
+}
+
+
+def _load_ocr_modules():
+    """OCR用モジュールを読み込む（未インストールの場合はImportError）"""
+    import pytesseract
+    from PIL import Image
+
+    # Windows用のみTesseractのパスを設定（Linux/Dockerでは不要）
+    if platform.system() == 'Windows':
+        pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+    return pytesseract, Image
+
+
+class OCREngine(ABC):
+    """画像1枚をOCRするエンジン（ワーカープロセスごとに1つ作って使い回す）"""
+
+    @abstractmethod
+    def image_to_string(self, image) -> str:
+        raise NotImplementedError
+
+
+class PytesseractEngine(OCREngine):
+    """画像ごとにtesseractコマンドを起動する（言語データも毎回読み込まれる）"""
+
+    def __init__(self):
+        self._pytesseract, _ = _load_ocr_modules()
+
+    def image_to_string(self, image) -> str:
+        try:
+            return self._pytesseract.image_to_string(image, lang=OCR_LANG)
+        except self._pytesseract.TesseractNotFoundError as e:
+            # TesseractNotFoundErrorは親プロセスで復元できず、プロセスプール全体が壊れるため置き換える
+            raise RuntimeError(str(e)) from None
+
+
+class TesserocrEngine(OCREngine):
+    """libtesseractのAPIを開いたまま使い回す（言語データの読み込みはワーカー起動時の1回のみ）"""
+
+    def __init__(self):
+        import tesserocr
+        self._api = tesserocr.PyTessBaseAPI(lang=OCR_LANG)
+
+    def image_to_string(self, image) -> str:
+        self._api.SetImage(image)
+        return self._api.GetUTF8Text()
+
+
+def _engine_class() -> type:
+    """OCR_ENGINEのクラス（必要なモジュールがない場合はImportError）"""
+    if OCR_ENGINE == "tesserocr":
+        if importlib.util.find_spec("tesserocr") is None:
+            raise ImportError("No module named 'tesserocr'")
+        return TesserocrEngine
+    _load_ocr_modules()
+    return PytesseractEngine
+
+
+_engine: Optional[OCREngine] = None
+
+
+def get_ocr_engine() -> OCREngine:
+    """このプロセスのOCRエンジン（初回呼び出し時に作成）"""
+    global _engine
+    if _engine is None:
+        _engine = _engine_class()()
+    return _engine
+
+
+def _init_ocr_worker() -> None:
+    """ワーカープロセスの初期化（エンジンを先に読み込んでおく）"""
+    try:
+        get_ocr_engine()
+    except Exception:
+        # 初期化に失敗してもプールは壊さず、OCR実行時に改めてエラーにする
+        logger.warning("OCRエンジンの初期化に失敗しました", exc_info=True)
+
+
+def check_ocr_available() -> None:
+    """OCR機能が利用可能か確認（利用できない場合はImportError）"""
+    if _engine_class() is PytesseractEngine:
+        pytesseract, _ = _load_ocr_modules()
+        if shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+            raise ImportError("tesseract is not installed or it's not in your PATH")
+    from PIL import Image  # noqa: F401
+    import fitz  # noqa: F401
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+
+def _gray_image(pix):
+    """グレースケールのPixmapをコピーせずにPILの画像にする（pixは使い終わるまで保持すること）"""
+    from PIL import Image
+
+    return Image.frombuffer("L", (pix.width, pix.height), pix.samples_mv, "raw", "L", pix.stride, 1)
+
+
+def _median_line_height(pix) -> Optional[float]:
+    """縮小画像の各行に文字の画素があるかを調べ、文字のある行が続く高さの中央値をpt単位で返す
+
+    文字の画素がまったくないページはNone。
+    """
+    samples = pix.samples
+    stride = pix.stride
+    rows = (min(samples[y * stride:y * stride + pix.width]) < OCR_INK_THRESHOLD for y in range(pix.height))
+    runs = []
+    run = 0
+    for has_ink in rows:
+        if has_ink:
+            run += 1
+        elif run:
+            runs.append(run)
+            run = 0
+    if run:
+        runs.append(run)
+    if not runs:
+        return None
+    # 罫線やノイズ（1px）、スキャンの黒枠や図など1行とは考えられない高さのものは除く
+    px_per_pt = OCR_PREVIEW_DPI / 72
+    lines = sorted(r for r in runs if 1 < r <= OCR_MAX_LINE_PT * px_per_pt)
+    if not lines:
+        return OCR_DEFAULT_LINE_PT
+    return lines[len(lines) // 2] / px_per_pt
+
+
+def _image_regions(page) -> List[list]:
+    """ページ上の画像の領域を [fitz.Rect, 画像の解像度(dpi)] の一覧で返す（重なる画像は1つの領域にまとめる）"""
+    regions = []
+    for info in page.get_image_info():
+        rect = page.rect & info["bbox"]
+        if rect.is_empty or rect.width < OCR_MIN_REGION_PT or rect.height < OCR_MIN_REGION_PT:
+            continue
+        region = [rect, info["width"] / (abs(info["bbox"][2] - info["bbox"][0]) / 72)]
+        # 重なる領域を取り込みながら広げる（スキャン画像が帯状に分割されている場合など）
+        merged = True
+        while merged:
+            merged = False
+            for other in regions:
+                if other[0].intersects(region[0]):
+                    regions.remove(other)
+                    region = [region[0] | other[0], max(region[1], other[1])]
+                    merged = True
+                    break
+        regions.append(region)
+    return regions
+
+
+def choose_ocr_dpi(line_height_pt: float, native_dpi: Optional[float] = None) -> float:
+    """1行の高さがOCR_TARGET_LINE_PXになるDPI（OCR_MIN_DPI〜OCR_MAX_DPI、スキャン解像度が上限）"""
+    dpi = OCR_TARGET_LINE_PX * 72 / line_height_pt
+    if native_dpi:
+        dpi = min(dpi, native_dpi)
+    return max(OCR_MIN_DPI, min(OCR_MAX_DPI, dpi))
+
+
+def _ocr_region(page, clip=None, native_dpi: Optional[float] = None) -> str:
+    """ページ（clip指定時はその範囲）を描画してOCR（文字の画素がなければ空文字）
+
+    縮小画像から推定した行の高さでDPIを決め、グレースケールで描画して
+    PNGを経由せずにTesseractへ渡す。
+    """
+    import fitz  # PyMuPDF
+
+    zoom = OCR_PREVIEW_DPI / 72
+    preview_pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, colorspace=fitz.csGRAY, alpha=False)
+    line_height = _median_line_height(preview_pix)
+    if line_height is None:
+        return ""
+
+    zoom = choose_ocr_dpi(line_height, native_dpi) / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, colorspace=fitz.csGRAY, alpha=False)
+    return get_ocr_engine().image_to_string(_gray_image(pix))
+
+
+def ocr_pdf_page(pdf_path: str, page_num: int) -> str:
+    """PDFの1ページからテキストを抽出し、埋め込みテキストのない部分だけOCR（ワーカープロセスで実行）
+
+    埋め込みテキストのブロックはそのまま使い、画像のうち中に埋め込みテキストがないもの
+    （スキャンした問題文・ふりがな・図など）だけを画像の範囲で切り出してOCRする。
+    結果はブロックの位置で上から順（同じ高さなら左から）に並べる。
+    テキストも画像もないページ（文字がアウトライン化されたものなど）はページ全体をOCRする。
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_num]
+        text_blocks = [
+            (fitz.Rect(x0, y0, x1, y1), text.strip())
+            for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks")
+            if block_type == 0 and text.strip()
+        ]
+        regions = _image_regions(page)
+
+        # 埋め込みテキストで覆われている画像（OCR済みのスキャンPDFなど）はOCRしない
+        ocr_regions = []
+        for rect, native_dpi in regions:
+            covered = sum(len(text) for block, text in text_blocks if (block.tl + block.br) / 2 in rect)
+            if covered < OCR_TEXT_LAYER_MIN_CHARS:
+                ocr_regions.append((rect, native_dpi))
+
+        if not ocr_regions:
+            if text_blocks or regions:
+                return page.get_text()
+            return _ocr_region(page)
+
+        blocks = list(text_blocks)
+        for rect, native_dpi in ocr_regions:
+            text = _ocr_region(page, rect, native_dpi).strip()
+            if text:
+                blocks.append((rect, text))
+
+    blocks.sort(key=lambda block: (round(block[0].y0), block[0].x0))
+    return "".join(text + "\n" for _, text in blocks)
+
+
+def ocr_image_file(image_path: str) -> str:
+    """画像ファイルを直接OCR（ワーカープロセスで実行）"""
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        # TesseractはグレースケールにしてからOCRするため、先に変換して渡すデータを減らす
+        return get_ocr_engine().image_to_string(image.convert("L"))
+
+
+def get_ocr_executor() -> ProcessPoolExecutor:
+    """OCR用のプロセスプール（ocr_max_workersで並列数を制限）
+
+    ワーカーは起動時にOCRエンジンを作成し、以降のページで使い回す。
+    サーバーは複数のスレッドを動かしているため、forkではなくspawnでワーカーを起動する
+    （スレッドが持っていたロックを引き継いだ子プロセスがデッドロックするのを避ける）。
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.ocr_max_workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_ocr_worker
+        )
+    return _executor
+
+
+def shutdown_ocr_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from app.config import get_settings
+from app.metrics import import_stage_seconds, run_timed
+from app.ocr import get_ocr_executor, ocr_image_file, ocr_pdf_page
+from app.upload_cache import upload_cache
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+def combine_pages(pages: List[Dict]) -> str:
+    """ページごとのOCR結果をページ順に結合"""
+    return "".join(page["text"] + "\n\n" for page in sorted(pages, key=lambda p: p["page"]))
+
+
+class OCRJobStore(ABC):
+    """OCRジョブの状態保存先
+
+    get() は次の形式の辞書を返す:
+    {"job_id", "user_id", "filename", "status", "total_pages",
+     "completed_pages", "error", "created_at", "pages": [{"page", "text"}, ...]}
+    """
+
+    @abstractmethod
+    def create(self, job_id: str, user_id: int, filename: str, total_pages: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_page(self, job_id: str, page_num: int, text: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+
+class InMemoryOCRJobStore(OCRJobStore):
+    """プロセス内の辞書にジョブを保持（古いジョブは作成時に削除）"""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id, user_id, filename, total_pages):
+        now = time.time()
+        with self._lock:
+            expired = [k for k, job in self._jobs.items() if now - job["created_at"] > self.ttl_seconds]
+            for k in expired:
+                del self._jobs[k]
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "user_id": user_id,
+                "filename": filename,
+                "status": JOB_QUEUED,
+                "total_pages": total_pages,
+                "error": None,
+                "created_at": now,
+                "pages": {}
+            }
+
+    def set_status(self, job_id, status, error=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job["status"] = status
+                job["error"] = error
+
+    def save_page(self, job_id, page_num, text):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job["pages"][page_num] = text
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            pages = [{"page": n, "text": t} for n, t in sorted(job["pages"].items())]
+            return {**job, "completed_pages": len(pages), "pages": pages}
+
+
+class SQLiteOCRJobStore(OCRJobStore):
+    """SQLiteファイルにジョブを保存（外部ブローカー不要・再起動後も参照可能）"""
+
+    def __init__(self, path: str, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_jobs ("
+                " job_id TEXT PRIMARY KEY, user_id INTEGER, filename TEXT, status TEXT,"
+                " total_pages INTEGER, error TEXT, created_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_job_pages ("
+                " job_id TEXT, page INTEGER, text TEXT, PRIMARY KEY (job_id, page))"
+            )
+
+    def create(self, job_id, user_id, filename, total_pages):
+        now = time.time()
+        with self._lock, self._conn:
+            cutoff = now - self.ttl_seconds
+            self._conn.execute(
+                "DELETE FROM ocr_job_pages WHERE job_id IN (SELECT job_id FROM ocr_jobs WHERE created_at < ?)",
+                (cutoff,)
+            )
+            self._conn.execute("DELETE FROM ocr_jobs WHERE created_at < ?", (cutoff,))
+            self._conn.execute(
+                "INSERT INTO ocr_jobs VALUES (?, ?, ?, ?, ?, NULL, ?)",
+                (job_id, user_id, filename, JOB_QUEUED, total_pages, now)
+            )
+
+    def set_status(self, job_id, status, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE ocr_jobs SET status = ?, error = ? WHERE job_id = ?",
+                (status, error, job_id)
+            )
+
+    def save_page(self, job_id, page_num, text):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_job_pages VALUES (?, ?, ?)",
+                (job_id, page_num, text)
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, user_id, filename, status, total_pages, error, created_at"
+                " FROM ocr_jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+            if not row:
+                return None
+            pages = [
+                {"page": page, "text": text}
+                for page, text in self._conn.execute(
+                    "SELECT page, text FROM ocr_job_pages WHERE job_id = ? ORDER BY page",
+                    (job_id,)
+                )
+            ]
+        keys = ("job_id", "user_id", "filename", "status", "total_pages", "error", "created_at")
+        return {**dict(zip(keys, row)), "completed_pages": len(pages), "pages": pages}
+
+
+def _create_job_store() -> OCRJobStore:
+    if settings.ocr_job_store == "sqlite":
+        return SQLiteOCRJobStore(settings.ocr_job_db_path, settings.ocr_job_ttl_seconds)
+    return InMemoryOCRJobStore(settings.ocr_job_ttl_seconds)
+
+
+job_store = _create_job_store()
+
+
+async def run_ocr_job(
+    job_id: str, file_path: str, is_pdf: bool, total_pages: int, cache_key: Optional[str] = None
+) -> None:
+    """ページ単位でプロセスプールにOCRを投げ、完了したページから保存する（成功時はcache_keyで結果をキャッシュ）"""
+    loop = asyncio.get_running_loop()
+    executor = get_ocr_executor()
+    job_store.set_status(job_id, JOB_RUNNING)
+
+    async def ocr_page(page_num: int):
+        if is_pdf:
+            text, seconds = await loop.run_in_executor(executor, run_timed, ocr_pdf_page, file_path, page_num)
+        else:
+            text, seconds = await loop.run_in_executor(executor, run_timed, ocr_image_file, file_path)
+        import_stage_seconds.observe("ocr_page", seconds)
+        job_store.save_page(job_id, page_num, text)
+
+    try:
+        # 全ページの終了を待ってから一時ファイルを削除する
+        results = await asyncio.gather(
+            *(ocr_page(page_num) for page_num in range(total_pages)),
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            logger.error("OCRジョブエラー (%s): %s", job_id, errors[0], exc_info=errors[0])
+            job_store.set_status(job_id, JOB_FAILED, str(errors[0]))
+        else:
+            job_store.set_status(job_id, JOB_COMPLETED)
+            if cache_key:
+                pages = job_store.get(job_id)["pages"]
+                await loop.run_in_executor(None, upload_cache.put, cache_key, {
+                    "pages": [page["text"] for page in pages],
+                    "extracted_text": combine_pages(pages) if is_pdf else pages[0]["text"]
+                })
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
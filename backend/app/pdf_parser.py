@@ -1,43 +1,110 @@
 import fitz  # PyMuPDF
+import logging
+import multiprocessing
 import re
-from typing import List, Dict, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+PARSER_VERSION = 1  # 解析結果が変わる修正をしたら上げる（アップロードキャッシュのキーに含める）
+
+# 選択肢パターン: (種類, 選択肢マーカー, 同じ行で選択肢を区切る次のマーカー)
+# マーカーの後には選択肢の本文が1文字以上続く必要がある
+CHOICE_MARKER_PATTERNS = [
+    ('numeric', re.compile(r'^\s*([1-4])\s+(?=.)', re.MULTILINE | re.DOTALL), None),  # 1 選択肢
+    ('katakana', re.compile(r'[（(]([ア-エ])[）)]\s*(?=.)', re.DOTALL), re.compile(r'[（(][ア-エ][）)]')),  # （ア）
+    ('circled', re.compile(r'([①-④])\s*(?=.)', re.DOTALL), re.compile(r'[①-④]')),  # ①
+    ('alpha', re.compile(r'([A-D])\s*[．.\s]\s*(?=.)', re.DOTALL), re.compile(r'[A-D]\s*[．.]')),  # A.
+]
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    """指定範囲のページのテキストを抽出（ワーカープロセスで実行）"""
+    with fitz.open(pdf_path) as doc:
+        return [doc[page_num].get_text() for page_num in range(start, stop)]
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """テキスト抽出用のプロセスプール（OCRのプールとは分け、OCR待ちの後ろに並ばないようにする）
+
+    OCRのプールと同じく、スレッドを動かしているサーバーからforkしないようspawnで起動する。
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.pdf_extract_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def shutdown_pdf_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
 
 class PDFParser:
     """PDF解析クラス（PyMuPDF使用）"""
     
     @staticmethod
-    def extract_text(pdf_path: str) -> str:
+    def iter_pages(pdf_path: str, executor: Optional[Executor] = None, pages_per_task: int = 8) -> Iterator[str]:
+        """PDFからページ単位でテキストを抽出して順に返す
+        
+        executor を指定すると、pages_per_task ページずつの範囲に分けて並列に抽出する。
+        """
+        with fitz.open(pdf_path) as doc:
+            page_count = len(doc)
+            if executor is None or page_count <= pages_per_task:
+                for page_num in range(page_count):
+                    yield doc[page_num].get_text()
+                return
+        
+        futures = [
+            executor.submit(_extract_page_range, pdf_path, start, min(start + pages_per_task, page_count))
+            for start in range(0, page_count, pages_per_task)
+        ]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    @staticmethod
+    def extract_text(pdf_path: str, executor: Optional[Executor] = None) -> str:
         """PDFからテキストを抽出"""
         text = ""
         try:
-            # PyMuPDFでPDFを開く
-            doc = fitz.open(pdf_path)
+            text = "".join(page_text + "\n" for page_text in PDFParser.iter_pages(pdf_path, executor))
+            logger.debug("合計 %d 文字を抽出しました", len(text))
             
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                # テキスト抽出
-                page_text = page.get_text()
-                text += page_text + "\n"
-                
-            doc.close()
-            
-            print(f"合計 {len(text)} 文字を抽出しました")
-            
-        except Exception as e:
-            print(f"PDF読み込みエラー: {e}")
+        except Exception:
+            logger.exception("PDF読み込みエラー: %s", pdf_path)
         
         return text
     
     @staticmethod
     def parse_questions(text: str) -> List[Dict]:
         """テキストから問題を抽出"""
-        questions = []
-        
         # デバッグ用：抽出したテキストの最初の500文字をログ出力
-        print("=== PDF抽出テキスト（最初の500文字）===")
-        print(text[:500])
-        print("=====================================")
+        logger.debug("PDF抽出テキスト（最初の500文字）:\n%s", text[:500])
         
+        questions = list(PDFParser.iter_questions(text.split('\n')))
+        logger.debug("合計 %d 個の問題を抽出しました", len(questions))
+        return questions
+    
+    @staticmethod
+    def parse_pages(pages: Iterable[str]) -> Iterator[Dict]:
+        """ページ単位のテキストから問題を順に抽出（前のページの解析中に次のページを抽出できる）"""
+        lines = (line for page_text in pages for line in (page_text + "\n").split('\n'))
+        return PDFParser.iter_questions(lines)
+    
+    @staticmethod
+    def iter_questions(lines: Iterable[str]) -> Iterator[Dict]:
+        """行の並びから問題を抽出して順に返す"""
         # より柔軟な問題番号パターン
         # 問1、問 1、（1）、(1)、1、1.、問１など
         question_patterns = [
@@ -46,7 +113,6 @@ class PDFParser:
             r'^(\d+)\s*[．.\s]',  # 1. または 1
         ]
         
-        lines = text.split('\n')
         current_question = None
         current_text = []
         
@@ -62,17 +128,17 @@ class PDFParser:
                 if match:
                     # 前の問題を保存
                     if current_question and current_text:
-                        questions.append(PDFParser._create_question_dict(
+                        yield PDFParser._create_question_dict(
                             current_question,
                             '\n'.join(current_text)
-                        ))
+                        )
                     
                     # 新しい問題を開始
                     question_num = int(match.group(1))
                     current_question = question_num
                     current_text = [line]
                     question_found = True
-                    print(f"問題検出: 問{question_num}")
+                    logger.debug("問題検出: 問%d", question_num)
                     break
             
             if not question_found and current_question is not None:
@@ -80,49 +146,68 @@ class PDFParser:
         
         # 最後の問題を保存
         if current_question and current_text:
-            questions.append(PDFParser._create_question_dict(
+            yield PDFParser._create_question_dict(
                 current_question,
                 '\n'.join(current_text)
-            ))
+            )
+    
+    @staticmethod
+    def _find_choice_spans(text: str, marker_pattern: re.Pattern, stop_pattern: Optional[re.Pattern]) -> List[Tuple[int, int, int]]:
+        """選択肢の位置 (マーカー開始, 本文開始, 終了) を1回の走査で求める
         
-        print(f"合計 {len(questions)} 個の問題を抽出しました")
-        return questions
+        選択肢の本文は、次の選択肢マーカーか行末までとする。
+        """
+        spans = []
+        pos = 0
+        text_length = len(text)
+        while True:
+            marker = marker_pattern.search(text, pos)
+            if not marker:
+                break
+            body_start = marker.end()
+            # 本文は1文字以上。行末または同じ行の次のマーカーの手前まで
+            end = text.find('\n', body_start + 1)
+            if end == -1:
+                end = text_length
+            if stop_pattern is not None:
+                next_marker = stop_pattern.search(text, body_start + 1, end)
+                if next_marker:
+                    end = next_marker.start()
+                else:
+                    # 行末の文字から改行をまたいでマーカーが続く場合（例: "B\n．"）
+                    last = end - 1
+                    while last > body_start and text[last].isspace():
+                        last -= 1
+                    if last > body_start and stop_pattern.match(text, last):
+                        end = last
+            spans.append((marker.start(), body_start, end))
+            pos = end
+        return spans
     
     @staticmethod
     def _create_question_dict(question_num: int, text: str) -> Dict:
         """問題テキストから辞書を作成"""
-        print(f"\n=== 問{question_num}の処理 ===")
-        print(f"テキスト: {text[:200]}...")
-        
-        # 選択肢パターンを試す（より柔軟に）
-        choice_patterns = [
-            (r'^\s*([1-4])\s+(.+?)(?=\n\s*[1-4]\s+|\n\n|$)', 'numeric'),  # 1 選択肢
-            (r'[（(]([ア-エ])[）)]\s*(.+?)(?=\s*[（(][ア-エ][）)]|\n\n|$)', 'katakana'),  # （ア）
-            (r'([①-④])\s*(.+?)(?=\s*[①-④]|\n\n|$)', 'circled'),  # ①
-            (r'([A-D])\s*[．.\s]\s*(.+?)(?=\s*[A-D]\s*[．.]|\n\n|$)', 'alpha'),  # A.
-        ]
+        logger.debug("問%dの処理: %s...", question_num, text[:200])
         
         choices = []
         prompt_text = text
         
-        for pattern, pattern_type in choice_patterns:
-            matches = re.findall(pattern, text, re.MULTILINE | re.DOTALL)
-            if len(matches) >= 2:
-                choices = [match[1].strip() for match in matches if match[1].strip()]
-                print(f"選択肢パターン '{pattern_type}' で {len(choices)} 個検出")
+        # 選択肢パターンを順に試し、2個以上見つかったパターンを採用
+        for pattern_type, marker_pattern, stop_pattern in CHOICE_MARKER_PATTERNS:
+            spans = PDFParser._find_choice_spans(text, marker_pattern, stop_pattern)
+            if len(spans) >= 2:
+                choices = [text[body_start:end].strip() for _, body_start, end in spans]
+                choices = [choice for choice in choices if choice]
+                logger.debug("選択肢パターン '%s' で %d 個検出", pattern_type, len(choices))
                 
-                # 選択肢部分を本文から削除
-                for match in matches:
-                    if pattern_type == 'numeric':
-                        pattern_to_remove = f"{match[0]} {match[1]}"
-                    elif pattern_type == 'katakana':
-                        pattern_to_remove = f"({match[0]}){match[1]}" if '（' not in text else f"（{match[0]}）{match[1]}"
-                    elif pattern_type == 'circled':
-                        pattern_to_remove = f"{match[0]}{match[1]}"
-                    else:
-                        pattern_to_remove = f"{match[0]}.{match[1]}"
-                    
-                    prompt_text = prompt_text.replace(pattern_to_remove, '', 1)
+                # 選択肢部分を本文から削除（位置で切り出すので再走査しない）
+                pieces = []
+                prev_end = 0
+                for start, _, end in spans:
+                    pieces.append(text[prev_end:start])
+                    prev_end = end
+                pieces.append(text[prev_end:])
+                prompt_text = ''.join(pieces)
                 break
         
         # クリーンアップ
@@ -130,8 +215,7 @@ class PDFParser:
         prompt_text = re.sub(r'^\s*(?:問|もん)\s*[（(]?\d+[）)]?\s*', '', prompt_text)  # 問題番号を削除
         prompt_text = prompt_text.strip()
         
-        print(f"本文: {prompt_text[:100]}...")
-        print(f"選択肢数: {len(choices)}")
+        logger.debug("本文: %s... / 選択肢数: %d", prompt_text[:100], len(choices))
         
         return {
             "order": question_num,
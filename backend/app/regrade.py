@@ -0,0 +1,211 @@
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import Text, cast, func, select, update
+from sqlalchemy.orm import Session
+from app.answer_key import ExamAnswerKey, load_answer_key
+from app.database import SessionLocal
+from app.exam_cache import invalidate_exam
+from app.models import Attempt, AttemptItem, Exam
+from app.scoring import ScoringRules, score_attempts
+
+logger = logging.getLogger(__name__)
+
+REGRADE_RUNNING = "running"
+REGRADE_COMPLETED = "completed"
+REGRADE_FAILED = "failed"
+
+DEFAULT_CHUNK_SIZE = 2000  # 1回の読み込み・書き込みでまとめる回答行数
+
+
+class RegradeStatusStore:
+    """試験ごとの再採点の進捗（プロセス内に保持）"""
+
+    def __init__(self):
+        self._status: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def start(self, exam_id: int) -> bool:
+        """実行中でなければ開始状態にしてTrueを返す"""
+        with self._lock:
+            current = self._status.get(exam_id)
+            if current and current["status"] == REGRADE_RUNNING:
+                return False
+            self._status[exam_id] = {
+                "exam_id": exam_id,
+                "status": REGRADE_RUNNING,
+                "total_attempts": None,
+                "processed_attempts": 0,
+                "changed_items": 0,
+                "started_at": time.time(),
+                "finished_at": None,
+                "error": None
+            }
+            return True
+
+    def update(self, exam_id: int, **values) -> None:
+        with self._lock:
+            if exam_id in self._status:
+                self._status[exam_id].update(values)
+
+    def get(self, exam_id: int) -> Optional[Dict]:
+        with self._lock:
+            status = self._status.get(exam_id)
+            return dict(status) if status else None
+
+
+regrade_status = RegradeStatusStore()
+
+
+class _AttemptBatch:
+    """書き込み待ちの再採点結果"""
+
+    def __init__(self):
+        self.item_updates: List[dict] = []
+        self.attempt_ids: List[int] = []
+        self.masks: List[int] = []
+
+    def __len__(self):
+        return len(self.item_updates) + len(self.attempt_ids)
+
+
+def _flush_batch(write_db: Session, answer_key: ExamAnswerKey, rules: ScoringRules, batch: _AttemptBatch) -> None:
+    """採点結果をまとめてUPDATE（主キー指定のバルク更新）"""
+    if batch.item_updates:
+        write_db.execute(update(AttemptItem), batch.item_updates)
+    if batch.attempt_ids:
+        results = score_attempts(answer_key, batch.masks, rules)
+        write_db.execute(update(Attempt), [
+            {
+                "id": attempt_id,
+                "score": result.score,
+                "total_score": result.score,
+                "is_passed": result.is_passed,
+                "raw_result": {"section_scores": result.section_scores}
+            }
+            for attempt_id, result in zip(batch.attempt_ids, results)
+        ])
+    write_db.commit()
+
+
+def regrade_exam(
+    exam_id: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[Callable[[int, int, int], None]] = None
+) -> Dict:
+    """試験の全受験を現在の正解・採点ルールで採点し直す
+
+    回答行は受験ID順にyield_perで少しずつ読み込み、正誤が変わった回答と
+    終了済み受験の得点をchunk_size件ごとにバルク更新してコミットする。
+    読み込みと書き込みは別セッション（書き込みのコミットで読み込み中のカーソルを閉じないため）。
+    on_progress は (処理済み受験数, 全受験数, 正誤が変わった回答数) で呼ばれる。
+    戻り値は {"total_attempts", "processed_attempts", "changed_items"}。
+    """
+    # 正解が直接修正されている可能性があるため、キャッシュ済みの正解キーは破棄する
+    invalidate_exam(exam_id)
+
+    read_db = SessionLocal()
+    write_db = SessionLocal()
+    try:
+        exam = read_db.get(Exam, exam_id)
+        if exam is None:
+            raise ValueError(f"Exam {exam_id} not found")
+        answer_key = load_answer_key(read_db, exam_id)
+        rules = ScoringRules.from_config(exam.config)
+        total_attempts = read_db.execute(
+            select(func.count(Attempt.id)).where(Attempt.exam_id == exam_id)
+        ).scalar_one()
+        if on_progress:
+            on_progress(0, total_attempts, 0)
+
+        rows = read_db.execute(
+            select(
+                Attempt.id, Attempt.ended_at,
+                AttemptItem.id, AttemptItem.question_id,
+                cast(AttemptItem.selected, Text),  # JSONの文字列のまま受け取り、同じ回答の判定結果を使い回す
+                AttemptItem.is_correct
+            )
+            .outerjoin(AttemptItem, AttemptItem.attempt_id == Attempt.id)
+            .where(Attempt.exam_id == exam_id)
+            .order_by(Attempt.id)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        processed = 0
+        changed_items = 0
+        batch = _AttemptBatch()
+        current_attempt = None  # (attempt_id, ended_at)
+        mask = 0
+        grade_memo: Dict[Tuple[int, Optional[str]], Optional[bool]] = {}
+
+        def finish_current():
+            nonlocal processed
+            if current_attempt is None:
+                return
+            attempt_id, ended_at = current_attempt
+            # 未終了の受験は回答の正誤のみ更新し、得点は終了時に計算する
+            if ended_at is not None:
+                batch.attempt_ids.append(attempt_id)
+                batch.masks.append(mask)
+            processed += 1
+
+        for attempt_id, ended_at, item_id, question_id, selected_json, is_correct in rows:
+            if current_attempt is None or current_attempt[0] != attempt_id:
+                finish_current()
+                if len(batch) >= chunk_size:
+                    _flush_batch(write_db, answer_key, rules, batch)
+                    batch = _AttemptBatch()
+                    if on_progress:
+                        on_progress(processed, total_attempts, changed_items)
+                current_attempt = (attempt_id, ended_at)
+                mask = 0
+            if item_id is None:
+                continue
+
+            memo_key = (question_id, selected_json)
+            if memo_key in grade_memo:
+                new_is_correct = grade_memo[memo_key]
+            else:
+                selected = json.loads(selected_json) if selected_json is not None else None
+                new_is_correct = grade_memo[memo_key] = answer_key.grade(question_id, selected)
+            if new_is_correct is None:
+                # 試験から削除された問題は元の判定のまま（得点には含めない）
+                continue
+            if new_is_correct != is_correct:
+                batch.item_updates.append({"id": item_id, "is_correct": new_is_correct})
+                changed_items += 1
+            if new_is_correct:
+                mask |= answer_key.questions[question_id].bit
+
+        finish_current()
+        _flush_batch(write_db, answer_key, rules, batch)
+        if on_progress:
+            on_progress(processed, total_attempts, changed_items)
+        return {"total_attempts": total_attempts, "processed_attempts": processed, "changed_items": changed_items}
+    finally:
+        write_db.close()
+        read_db.close()
+
+
+def run_regrade_job(exam_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """バックグラウンドで再採点を実行し、進捗をregrade_statusに記録（開始状態は呼び出し側で設定済み）"""
+    started = time.perf_counter()
+
+    def on_progress(processed: int, total: int, changed_items: int) -> None:
+        regrade_status.update(
+            exam_id, total_attempts=total, processed_attempts=processed, changed_items=changed_items
+        )
+        logger.info("再採点 exam=%s: %d / %d 受験", exam_id, processed, total)
+
+    try:
+        result = regrade_exam(exam_id, chunk_size, on_progress)
+        regrade_status.update(exam_id, status=REGRADE_COMPLETED, finished_at=time.time(), **result)
+        logger.info(
+            "再採点完了 exam=%s: %d 受験, 正誤変更 %d 件 (%.1fs)",
+            exam_id, result["processed_attempts"], result["changed_items"], time.perf_counter() - started
+        )
+    except Exception as e:
+        logger.exception("再採点エラー exam=%s", exam_id)
+        regrade_status.update(exam_id, status=REGRADE_FAILED, finished_at=time.time(), error=str(e))
@@ -142,6 +142,26 @@ class ExamBase(BaseModel):
 class ExamCreate(ExamBase):
     pass
 
+# Import Schemas（試験・セクション・問題を1リクエストでまとめて登録）
+class QuestionImport(QuestionBase):
+    answer: List[str]
+
+class ParsedQuestion(BaseModel):
+    """/pdf/upload・/pdf/upload-text の解析結果の1問（answerは選択肢番号）"""
+    type: QuestionType = QuestionType.KANJI_READING
+    prompt_text: str
+    choices: Optional[List[str]] = None
+    answer: List[str] = []
+    explanation_text: Optional[str] = None
+    metadata: Optional[dict] = {}
+
+class SectionImport(SectionBase):
+    questions: List[QuestionImport] = []
+    parsed_questions: List[ParsedQuestion] = []  # 解析結果をそのまま渡す場合（questionsの後ろに追加）
+
+class ExamImport(ExamBase):
+    sections: List[SectionImport] = []
+
 class ExamUpdate(BaseModel):
     title: Optional[str] = None
     is_public: Optional[bool] = None
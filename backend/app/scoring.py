@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from app.answer_key import ExamAnswerKey
+
+DEFAULT_MAX_SCORE = 100
+DEFAULT_PASS_RATIO = 0.6
+
+
+class ScoringRules(NamedTuple):
+    """採点ルール（exam.config から作成）
+
+    exam.config のキー:
+      max_score          満点（既定100。JLPT N1〜N3形式なら180）
+      pass_threshold     合格に必要な総合得点（max_score基準の点数。未指定・nullの場合は満点の60%）
+      section_min_score  セクションごとの基準点（全セクション共通の数値、またはセクション名→点数の辞書）
+    セクションの配点は max_score を Section.weight の比で配分する（問題のないセクションは除く）。
+    """
+    max_score: float
+    pass_threshold: Optional[float]  # Noneの場合は合否を判定しない
+    section_min_scores: Dict[str, float]
+    default_section_min_score: Optional[float]
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "ScoringRules":
+        # 設定がない試験は従来どおり合否なし
+        if not config:
+            return cls(DEFAULT_MAX_SCORE, None, {}, None)
+        max_score = float(config.get("max_score") or DEFAULT_MAX_SCORE)
+        pass_threshold = config.get("pass_threshold")
+        section_min = config.get("section_min_score")
+        return cls(
+            max_score=max_score,
+            pass_threshold=float(pass_threshold) if pass_threshold is not None else max_score * DEFAULT_PASS_RATIO,
+            section_min_scores=section_min if isinstance(section_min, dict) else {},
+            default_section_min_score=section_min if isinstance(section_min, (int, float)) else None
+        )
+
+    def section_min_score(self, title: str) -> Optional[float]:
+        return self.section_min_scores.get(title, self.default_section_min_score)
+
+
+class ScoreResult(NamedTuple):
+    score: int
+    total_questions: int
+    correct_count: int
+    section_scores: Dict[str, dict]
+    is_passed: Optional[bool]
+
+
+class _SectionPlan(NamedTuple):
+    """試験ごとに1回だけ計算するセクションの配点情報"""
+    title: str
+    mask: int
+    total: int
+    max_score: int
+    min_score: Optional[float]
+
+
+def _apportion(values: List[float], total: int) -> List[int]:
+    """合計がtotalになるように各値を整数に丸める（最大剰余方式: 切り捨て後、端数の大きい順に1ずつ足す）"""
+    floors = [int(value) for value in values]
+    order = sorted(range(len(values)), key=lambda i: values[i] - floors[i], reverse=True)
+    for i in order[:max(0, total - sum(floors))]:
+        floors[i] += 1
+    return floors
+
+
+def _plan_sections(answer_key: ExamAnswerKey, rules: ScoringRules) -> List[_SectionPlan]:
+    totals = [mask.bit_count() for mask in answer_key.section_masks]
+    weight_sum = sum(w for w, total in zip(answer_key.section_weights, totals) if total > 0)
+    shares = [
+        rules.max_score * weight / weight_sum if total > 0 and weight_sum > 0 else 0.0
+        for weight, total in zip(answer_key.section_weights, totals)
+    ]
+    # セクションの満点は整数にそろえ、合計を満点に一致させる
+    max_scores = _apportion(shares, round(sum(shares)))
+    return [
+        _SectionPlan(title, mask, total, max_score, rules.section_min_score(title))
+        for (_, title), mask, total, max_score in zip(answer_key.sections, answer_key.section_masks, totals, max_scores)
+    ]
+
+
+def _score_mask(plans: List[_SectionPlan], total_questions: int, correct_mask: int, rules: ScoringRules) -> ScoreResult:
+    corrects = [(correct_mask & plan.mask).bit_count() for plan in plans]
+    points = [
+        plan.max_score * correct / plan.total if plan.total > 0 else 0.0
+        for plan, correct in zip(plans, corrects)
+    ]
+    # セクション得点は合計が総合得点と一致するように丸める
+    score = round(sum(points))
+    section_points = _apportion(points, score)
+
+    sections_passed = True
+    section_scores = {}
+    for plan, correct, section_score in zip(plans, corrects, section_points):
+        passed = section_score >= plan.min_score if plan.min_score is not None and plan.total > 0 else None
+        if passed is False:
+            sections_passed = False
+        section_scores[plan.title] = {
+            "correct": correct,
+            "total": plan.total,
+            "percentage": int((correct / plan.total * 100)) if plan.total > 0 else 0,
+            "score": section_score,
+            "max_score": plan.max_score,
+            "passed": passed
+        }
+
+    is_passed = None
+    if rules.pass_threshold is not None:
+        is_passed = score >= rules.pass_threshold and sections_passed
+    return ScoreResult(score, total_questions, correct_mask.bit_count(), section_scores, is_passed)
+
+
+def score_attempt(answer_key: ExamAnswerKey, correct_mask: int, rules: ScoringRules) -> ScoreResult:
+    """正解ビットマスクから得点を計算（未回答の問題も不正解として分母に含める）"""
+    return score_attempts(answer_key, [correct_mask], rules)[0]
+
+
+def score_attempts(answer_key: ExamAnswerKey, correct_masks: Iterable[int], rules: ScoringRules) -> List[ScoreResult]:
+    """同じ試験の複数受験をまとめて採点（配点計算は1回のみ、受験ごとはセクション数分のpopcountだけ）"""
+    plans = _plan_sections(answer_key, rules)
+    total_questions = len(answer_key.questions)
+    return [_score_mask(plans, total_questions, mask, rules) for mask in correct_masks]
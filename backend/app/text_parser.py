@@ -1,6 +1,21 @@
+import logging
 import re
 from typing import List, Dict
 
+logger = logging.getLogger(__name__)
+
+# 1行を「問題番号 / 選択肢 / 答え / 解説」のいずれかに分類する（該当しなければ本文）
+# 各分岐は先頭文字が重ならないため、分岐の順序によって結果は変わらない
+LINE_TOKEN_PATTERN = re.compile(
+    r'^(?:'
+    r'(?P<question>(?:問|問題|Question)(?P<question_num>\d+)[\.:\)）：]?\s*(?P<question_rest>.*))'
+    r'|(?P<choice>[1-4][\.:\)）\s]+(?P<choice_text>.+))'
+    r'|(?P<answer>(?:答え|答|こたえ|正解|Answer)[：:：\.\s]*(?P<answer_num>[1-4]))'
+    r'|(?P<explanation>(?:解説|説明|Explanation)[：:\.]*\s*(?P<explanation_text>.+))'
+    r')',
+    re.IGNORECASE
+)
+
 class TextParser:
     """テキストファイルから問題を解析するクラス"""
     
@@ -30,33 +45,29 @@ class TextParser:
         
         questions = []
         
-        # 問題ブロックを分割（問X で始まる行で分割）
-        # 様々なパターンに対応: 問1, 問1:, 問1., 問1）, （1）, [1], 1., 1)
-        question_pattern = r'(?:問|問題|Question|\(|\[|^)(\d+)(?:\)|）|\]|\.|\:|：)?'
-        
-        # テキストを行に分割
-        lines = text.split('\n')
-        
         current_question = None
         current_choices = []
         current_prompt = []
         in_choices = False
         
-        for i, line in enumerate(lines):
+        for line in text.split('\n'):
             line = line.strip()
             if not line:
                 continue
             
+            # 行の種類を1回の照合で判定
+            match = LINE_TOKEN_PATTERN.match(line)
+            kind = match.lastgroup if match else None
+            
             # 問題番号を検出
-            q_match = re.match(r'^(?:問|問題|Question)(\d+)[\.:\)）：]?\s*(.*)', line, re.IGNORECASE)
-            if q_match:
+            if kind == 'question':
                 # 前の問題を保存
                 if current_question is not None:
                     questions.append(current_question)
                 
                 # 新しい問題を開始
-                question_num = int(q_match.group(1))
-                prompt_start = q_match.group(2).strip()
+                question_num = int(match.group('question_num'))
+                prompt_start = match.group('question_rest').strip()
                 
                 current_question = {
                     'order': question_num,
@@ -71,20 +82,20 @@ class TextParser:
                 in_choices = False
                 continue
             
+            # 問題開始前の行は無視
+            if current_question is None:
+                continue
+            
             # 選択肢を検出（1, 2, 3, 4 または 1), 2), 3), 4) など）
-            choice_match = re.match(r'^([1-4])[\.:\)）\s]+(.+)', line)
-            if choice_match and current_question is not None:
+            if kind == 'choice':
                 in_choices = True
-                choice_text = choice_match.group(2).strip()
-                current_choices.append(choice_text)
+                current_choices.append(match.group('choice_text').strip())
                 continue
             
-            # 答えを検出（より柔軟に）
-            answer_match = re.match(r'^(?:答え|答|こたえ|正解|Answer)[：:：\.\s]*([1-4])', line, re.IGNORECASE)
-            if answer_match and current_question is not None:
-                answer_num = answer_match.group(1)
+            # 答えを検出
+            if kind == 'answer':
                 # 答えを配列形式で保存（選択肢のインデックスではなく番号として）
-                current_question['answer'] = [str(answer_num)]
+                current_question['answer'] = [match.group('answer_num')]
                 current_question['choices'] = current_choices
                 # プロンプトテキストを更新
                 if current_prompt:
@@ -92,13 +103,12 @@ class TextParser:
                 continue
             
             # 解説を検出
-            explanation_match = re.match(r'^(?:解説|説明|Explanation)[：:\.]*\s*(.+)', line, re.IGNORECASE)
-            if explanation_match and current_question is not None:
-                current_question['explanation_text'] = explanation_match.group(1).strip()
+            if kind == 'explanation':
+                current_question['explanation_text'] = match.group('explanation_text').strip()
                 continue
             
             # 通常のテキスト（問題文の続き）
-            if current_question is not None and not in_choices:
+            if not in_choices:
                 current_prompt.append(line)
         
         # 最後の問題を保存
@@ -111,9 +121,6 @@ class TextParser:
                 current_question['choices'] = current_choices
             questions.append(current_question)
         
-        print(f"=== テキスト抽出結果 ===")
-        print(f"合計 {len(questions)} 個の問題を抽出しました")
-        for q in questions:
-            print(f"問{q['order']}: プロンプト={q['prompt_text'][:80]}... | 選択肢={len(q['choices'])}個 | 答え={q['answer']}")
+        logger.debug("テキストから %d 個の問題を抽出しました", len(questions))
         
         return questions
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class UploadCache:
+    """アップロードファイルの抽出・OCR結果をローカルディスクに保存するキャッシュ
+
+    キーはファイル内容のSHA-256と処理の種類・設定から作るため、同じ過去問の再アップロードでは
+    抽出やOCRを省略できる。エントリは1件1ファイルのJSONで、合計サイズがmax_bytesを超えたら
+    最終アクセスが古いものから削除する（読み込み時に更新日時を更新してLRUにする）。
+    ディスク上で管理するため、同じディレクトリを使うワーカー間で共有される。
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind: str, content_hash: str, params: dict) -> str:
+        """処理の種類・ファイル内容のSHA-256・結果に影響する設定からキーを作成"""
+        params_json = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(f"{kind}:{content_hash}:{params_json}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        if self.max_bytes <= 0:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("アップロードキャッシュの読み込みに失敗しました: %s", path, exc_info=True)
+            return None
+        logger.debug("アップロードキャッシュ ヒット: %s", key)
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        if self.max_bytes <= 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # 書き込み途中のファイルを読まれないよう、一時ファイルに書いてから置き換える
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.directory, suffix=".tmp", delete=False
+        ) as tmp_file:
+            json.dump(value, tmp_file, ensure_ascii=False)
+            tmp_path = tmp_file.name
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+
+upload_cache = UploadCache(settings.upload_cache_dir, settings.upload_cache_max_mb * 1024 * 1024)
@@ -0,0 +1,74 @@
+import json
+from typing import Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # multipartの境界・ヘッダー・他のフィールド分の余裕
+
+
+class UploadSizeLimitMiddleware:
+    """指定パス以下へのリクエストボディの大きさを、multipart解析より前に制限する
+
+    Content-Lengthが上限を超えていればボディを読まずに413を返す。
+    Content-Lengthがない（chunked）場合は受信したバイト数を数え、超えた時点で413を返して受信をやめる。
+    FastAPIはエンドポイントや依存関係を呼ぶ前にフォームを全て一時ファイルへスプールするため、
+    エンドポイント側のチェックだけでは巨大なアップロードを受信し終えるまで拒否できない。
+    """
+
+    def __init__(self, app: ASGIApp, path_prefixes: Tuple[str, ...], max_mb: int):
+        self.app = app
+        self.path_prefixes = path_prefixes
+        self.max_mb = max_mb
+        self.max_bytes = max_mb * 1024 * 1024 + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._send_too_large(send)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes and not response_started:
+                    # 先に413を返し、アプリ側には切断として伝えて残りの受信をやめさせる
+                    rejected = True
+                    await self._send_too_large(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, tracking_send)
+
+    async def _send_too_large(self, send: Send) -> None:
+        body = json.dumps(
+            {"detail": f"ファイルサイズは{self.max_mb}MB以下にしてください"}, ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"connection", b"close"),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
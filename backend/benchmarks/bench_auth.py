@@ -0,0 +1,88 @@
+"""認証済みリクエストの処理速度（req/sec）: 認証ユーザーキャッシュあり・なしの比較
+
+/auth/me と /exams に同じトークンで --requests 回ずつリクエストし、req/sec と
+1リクエストあたりのSQL文の数を表示する。キャッシュの設定はimport時に読まれるため、
+キャッシュあり（AUTH_USER_CACHE_TTL_SECONDS=60）となし（=0）をそれぞれ子プロセスで測る。
+
+    cd backend
+    python benchmarks/bench_auth.py --requests 1000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = ["/api/v1/auth/me", "/api/v1/exams"]
+
+
+def run_one(num_requests: int, num_exams: int) -> None:
+    """子プロセス: 一時DBにユーザーと試験を作り、各パスのreq/secを表示"""
+    sys.path.insert(0, BACKEND_DIR)
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app.database import async_engine, engine
+    from main import app
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("PRAGMA"):
+            statements.append(statement)
+
+    with TestClient(app) as client:
+        client.post("/api/v1/auth/register", json={"username": "bench", "name": "bench", "password": "pw"})
+        token = client.post(
+            "/api/v1/auth/login", data={"username": "bench", "password": "pw"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for i in range(num_exams):
+            client.post("/api/v1/exams", json={
+                "title": f"試験{i}", "level": "N1", "type": "mock", "mode": "practice", "is_public": True
+            }, headers=headers)
+
+        for target in (engine, async_engine.sync_engine):
+            event.listen(target, "before_cursor_execute", count_statement)
+        ttl = os.environ["AUTH_USER_CACHE_TTL_SECONDS"]
+        for path in PATHS:
+            client.get(path, headers=headers)  # キャッシュを温める
+            statements.clear()
+            started = time.perf_counter()
+            for _ in range(num_requests):
+                response = client.get(path, headers=headers)
+                assert response.status_code == 200, response.text
+            elapsed = time.perf_counter() - started
+            print(f"cache ttl={ttl:<3} {path:<18} {num_requests / elapsed:8.0f} req/sec  "
+                  f"{len(statements) / num_requests:.1f} SQL/req")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000, help="1パスあたりのリクエスト数")
+    parser.add_argument("--exams", type=int, default=20, help="一覧に表示する公開試験の数")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(args.requests, args.exams)
+        return
+
+    for ttl in ("60", "0"):
+        env = dict(
+            os.environ,
+            AUTH_USER_CACHE_TTL_SECONDS=ttl,
+            DATABASE_URL=f"sqlite:///{tempfile.mkdtemp(prefix='bench_auth_')}/bench.db",
+            BCRYPT_ROUNDS="4",
+            LOG_LEVEL="WARNING"
+        )
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child",
+             "--requests", str(args.requests), "--exams", str(args.exams)],
+            env=env, cwd=BACKEND_DIR, check=False
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""回答送信の同時実行（N人が同時に POST /attempts/{id}/answers を繰り返す）
+
+SQLiteのWAL・busy_timeout やプール設定の効果を確認する。各送信者は自分の受験に
+全問の回答を --rounds 回送り、全体のスループット・レイテンシ・失敗数（"database is locked" など）を表示する。
+設定は環境変数で切り替える（例: SQLITE_BUSY_TIMEOUT_MS=0, DB_POOL_SIZE=20, ANSWER_WRITE_BEHIND=true）。
+
+    cd backend
+    python benchmarks/bench_concurrent_answers.py --submitters 16 --rounds 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--submitters", type=int, default=16, help="同時に送信する受験者数")
+    parser.add_argument("--rounds", type=int, default=20, help="1人あたりの送信回数")
+    parser.add_argument("--questions", type=int, default=70, help="試験の問題数（1回の送信で全問に回答）")
+    parser.add_argument("--database-url", default="", help="未指定の場合は一時ディレクトリのSQLite")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    # app をimportする前にDBを決める
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='bench_answers_')}/bench.db"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    # 失敗（500など）も計測に含める
+    with TestClient(app, raise_server_exceptions=False) as client:
+        client.post("/api/v1/auth/register", json={"username": "bench", "name": "bench", "password": "pw"})
+        token = client.post(
+            "/api/v1/auth/login", data={"username": "bench", "password": "pw"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        exam = client.post("/api/v1/exams/import", json={
+            "title": "同時送信ベンチマーク", "level": "N1", "type": "mock", "mode": "practice", "is_public": True,
+            "sections": [{
+                "title": "セクション1", "order": 1,
+                "questions": [
+                    {"order": q + 1, "type": "kanji_reading", "prompt_text": f"問{q + 1}",
+                     "choices": ["あ", "い", "う", "え"], "answer": ["あ"]}
+                    for q in range(args.questions)
+                ]
+            }]
+        }, headers=headers).json()
+        question_ids = [q["id"] for section in client.get(
+            f"/api/v1/exams/{exam['id']}", headers=headers
+        ).json()["sections"] for q in section["questions"]]
+        attempt_ids = [
+            client.post("/api/v1/attempts", json={"exam_id": exam["id"]}, headers=headers).json()["attempt_id"]
+            for _ in range(args.submitters)
+        ]
+
+        latencies = []
+        errors = {}
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(args.submitters)
+
+        def submitter(attempt_id: int) -> None:
+            start_barrier.wait()
+            for i in range(args.rounds):
+                answers = [
+                    {"question_id": qid, "selected": ["あ" if (i + n) % 2 else "い"]}
+                    for n, qid in enumerate(question_ids)
+                ]
+                started = time.perf_counter()
+                response = client.post(f"/api/v1/attempts/{attempt_id}/answers", json={"answers": answers}, headers=headers)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    if response.status_code != 200:
+                        errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+        threads = [threading.Thread(target=submitter, args=(attempt_id,)) for attempt_id in attempt_ids]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    total = args.submitters * args.rounds
+    latencies.sort()
+    print(f"{args.submitters} submitters x {args.rounds} rounds ({args.questions} answers each)")
+    print(f"{total / elapsed:.0f} submits/sec  "
+          f"p50 {statistics.median(latencies) * 1000:.1f}ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms  "
+          f"errors {sum(errors.values())} {errors or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""OCRワーカープールの処理速度（pages/sec）: ページごとにtesseractを起動する場合と常駐エンジンの比較
+
+小さなスキャンページ（--pages 枚）のPDFを作り、エンジン（pytesseract / tesserocr）と
+ワーカー数の組み合わせごとに別プロセスで get_ocr_executor() に全ページを投入して測る。
+エンジンはimport時に決まるため、組み合わせごとにこのスクリプトを子プロセスとして起動する。
+
+--shim-load-seconds を指定すると、benchmarks/ocr_shim の代わりのtesseractコマンドとtesserocrを使う。
+どちらも起動・言語データの読み込みに相当する時間だけ待つので、Tesseractがない環境でも
+「ページごとの起動」と「ワーカーごとに1回の読み込み」の差とスケジューリングを確認できる。
+実際の速度はTesseractとtesserocrをインストールした環境でシムなしで測ること。
+
+    cd backend
+    python benchmarks/bench_ocr_pool.py --workers 1 2 4 --shim-load-seconds 0.2
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHIM_DIR = os.path.join(BACKEND_DIR, "benchmarks", "ocr_shim")
+ENGINES = ["pytesseract", "tesserocr"]
+
+
+def build_pdf(path: str, num_pages: int) -> None:
+    import fitz  # PyMuPDF
+
+    source = fitz.open()
+    page = source.new_page(width=300, height=200)
+    page.insert_text((20, 40), "問題文の一行です。", fontname="japan", fontsize=12)
+    png = page.get_pixmap(dpi=150, colorspace=fitz.csGRAY).tobytes("png")
+    doc = fitz.open()
+    for _ in range(num_pages):
+        scanned = doc.new_page(width=300, height=200)
+        scanned.insert_image(scanned.rect, stream=png)
+    doc.save(path)
+
+
+def run_one(pdf_path: str, num_pages: int) -> None:
+    """子プロセス: 環境変数で指定されたエンジン・ワーカー数で全ページをOCRし、pages/secを表示"""
+    sys.path.insert(0, BACKEND_DIR)
+    from app.ocr import OCR_ENGINE, get_ocr_executor, ocr_pdf_page, shutdown_ocr_executor
+
+    executor = get_ocr_executor()
+    workers = executor._max_workers
+    # ワーカーの起動（エンジンの作成）を待ってから計測する
+    list(executor.map(abs, range(workers * 4)))
+    time.sleep(float(os.environ.get("OCR_SHIM_LOAD_SECONDS", "0")) + 0.2)
+
+    started = time.perf_counter()
+    try:
+        list(executor.map(ocr_pdf_page, [pdf_path] * num_pages, range(num_pages)))
+    except Exception as e:
+        # エンジンがインストールされていない場合など
+        print(f"{OCR_ENGINE:<12} workers={workers:<3} skipped: {type(e).__name__}: {e}")
+        return
+    finally:
+        shutdown_ocr_executor()
+    elapsed = time.perf_counter() - started
+    print(f"{OCR_ENGINE:<12} workers={workers:<3} {num_pages / elapsed:8.1f} pages/sec")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=48, help="OCRするページ数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="比較するワーカー数")
+    parser.add_argument("--engines", nargs="+", default=ENGINES, choices=ENGINES)
+    parser.add_argument("--shim-load-seconds", type=float, default=None,
+                        help="代わりのtesseract/tesserocrを使い、起動ごとにこの秒数待つ")
+    parser.add_argument("--child", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(args.child, args.pages)
+        return
+
+    pdf_path = os.path.join(tempfile.mkdtemp(prefix="bench_ocr_pool_"), "pages.pdf")
+    build_pdf(pdf_path, args.pages)
+    for engine in args.engines:
+        for workers in args.workers:
+            env = dict(os.environ, OCR_ENGINE=engine, OCR_MAX_WORKERS=str(workers), LOG_LEVEL="WARNING")
+            if args.shim_load_seconds is not None:
+                env["OCR_SHIM_LOAD_SECONDS"] = str(args.shim_load_seconds)
+                env["PATH"] = SHIM_DIR + os.pathsep + env.get("PATH", "")
+                env["PYTHONPATH"] = SHIM_DIR + os.pathsep + env.get("PYTHONPATH", "")
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", pdf_path, "--pages", str(args.pages)],
+                env=env, cwd=BACKEND_DIR, check=False
+            )
+
+
+if __name__ == "__main__":
+    main()
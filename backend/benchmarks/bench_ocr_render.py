@@ -0,0 +1,105 @@
+"""OCRの描画段階（ページごとのDPI選択・グレースケール描画・埋め込みテキストのスキップ）
+
+スキャンした教材を模した合成コーパス（文字の大きさが異なるスキャンページ、白紙のスキャン、
+テキストレイヤーのあるページ）を作り、ocr_pdf_page で1周するのにかかる時間と、
+Tesseractに渡した画像の枚数・画素数・Python側のピークメモリを表示する。
+
+既定ではTesseractを呼ばず、渡された画像を記録するだけのエンジンに差し替えて描画段階だけを測る。
+--tesseract を付けるとインストール済みのエンジンでOCRまで実行する。
+
+    cd backend
+    python benchmarks/bench_ocr_render.py --corpus-out /tmp/ocr_corpus.pdf
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+from app import ocr
+
+# スキャンページの (フォントサイズpt, 行数)
+SCANNED_PAGES = [(10.5, 40), (10.5, 40), (12, 30), (16, 20), (20, 10)]
+SCAN_DPI = 200
+LINE_TEXT = "日本語能力試験の問題文です。" * 2
+
+
+class RecordingEngine(ocr.OCREngine):
+    """OCRせずに渡された画像の大きさとモードを記録する"""
+
+    def __init__(self):
+        self.images: List[Tuple[Tuple[int, int], str]] = []
+
+    def image_to_string(self, image) -> str:
+        self.images.append((image.size, image.mode))
+        return ""
+
+
+def _text_page(doc, font_size: float, lines: int) -> None:
+    page = doc.new_page()
+    y = 60
+    for _ in range(lines):
+        page.insert_text((50, y), LINE_TEXT, fontname="japan", fontsize=font_size)
+        y += font_size * 1.6
+
+
+def build_corpus(path: str) -> int:
+    """合成コーパスを保存してページ数を返す"""
+    source = fitz.open()
+    for font_size, lines in SCANNED_PAGES:
+        _text_page(source, font_size, lines)
+    source.new_page()  # 白紙
+
+    corpus = fitz.open()
+    # テキストを画像にしたスキャンページ
+    for page in source:
+        pix = page.get_pixmap(dpi=SCAN_DPI, colorspace=fitz.csGRAY)
+        scanned = corpus.new_page(width=page.rect.width, height=page.rect.height)
+        scanned.insert_image(scanned.rect, stream=pix.tobytes("png"))
+    # テキストレイヤーのあるページ（OCRしない）
+    corpus.insert_pdf(source, from_page=0, to_page=1)
+    corpus.save(path)
+    return len(corpus)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="コーパスを処理する回数（平均を表示）")
+    parser.add_argument("--corpus-out", default="", help="コーパスの保存先（未指定の場合は一時ファイル）")
+    parser.add_argument("--tesseract", action="store_true", help="実際にOCRする（Tesseractが必要）")
+    args = parser.parse_args()
+
+    path = args.corpus_out or os.path.join(tempfile.mkdtemp(prefix="bench_ocr_"), "corpus.pdf")
+    num_pages = build_corpus(path)
+
+    recorder = RecordingEngine()
+    if not args.tesseract:
+        ocr._engine = recorder
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for page_num in range(num_pages):
+            ocr.ocr_pdf_page(path, page_num)
+    elapsed = (time.perf_counter() - started) / args.repeat
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"corpus: {path} ({num_pages} pages)")
+    print(f"{elapsed * 1000:.0f}ms per pass  {num_pages / elapsed:.1f} pages/sec  python peak {peak / 2**20:.1f}MB")
+    if not args.tesseract:
+        images = recorder.images[:len(recorder.images) // args.repeat]
+        pixels = sum(width * height for (width, height), _ in images)
+        print(f"OCR calls {len(images)}  pixels to tesseract {pixels / 1e6:.1f}M  "
+              f"modes {sorted(set(mode for _, mode in images))}")
+        print("image sizes", [size for size, _ in images])
+
+
+if __name__ == "__main__":
+    main()
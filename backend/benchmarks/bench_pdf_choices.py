@@ -0,0 +1,60 @@
+"""PDFParser._create_question_dict の選択肢抽出（長文・異常な入力での計算量）
+
+長文読解のような長い本文や、選択肢マーカーに似た文字が大量に続く入力で、
+入力を4倍にしたときの処理時間の比を表示する。線形なら約4倍、二次なら約16倍になる。
+比が --max-ratio を超えたケースがあれば終了コード1で終わる（回帰の検出用）。
+
+    cd backend
+    python benchmarks/bench_pdf_choices.py --size 50000
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.pdf_parser import PDFParser
+
+# (名前, 大きさnから問題テキストを作る関数)
+CASES: List[Tuple[str, Callable[[int], str]]] = [
+    ("長文 + カタカナ選択肢", lambda n: "長文" * n + "\n（ア）" + "あ" * n + "\n（イ）い\n（ウ）う\n（エ）え"),
+    ("長い1行の丸数字選択肢", lambda n: "①" + "文" * n + "②あ③い④う"),
+    ("選択肢なしの長文", lambda n: ("本文の続きです。" * 10 + "\n") * (n // 80)),
+    ("英字マーカー風の行の連続", lambda n: ("A " + "x" * 50 + "\n") * (n // 52)),
+    ("マーカー後の空白の連続", lambda n: "A" + " " * n + "B. x"),
+    ("数字行の連続", lambda n: "問1 本文\n" + ("1 " + "選" * 20 + "\n") * (n // 23)),
+]
+
+
+def measure(text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        PDFParser._create_question_dict(1, text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=50_000, help="入力の大きさ（おおよその文字数）")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数（最速の回を使う）")
+    parser.add_argument("--max-ratio", type=float, default=8.0, help="4倍の入力での時間比の許容上限")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'case':<24}{'n':>12}{'4n':>12}{'ratio':>8}")
+    for name, build in CASES:
+        small = measure(build(args.size), args.repeat)
+        large = measure(build(args.size * 4), args.repeat)
+        ratio = large / small if small > 0 else 0.0
+        mark = "" if ratio <= args.max_ratio else "  <-- 超線形"
+        failed = failed or ratio > args.max_ratio
+        print(f"{name:<24}{small * 1000:>10.2f}ms{large * 1000:>10.2f}ms{ratio:>8.1f}{mark}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
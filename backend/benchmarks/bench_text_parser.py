@@ -0,0 +1,61 @@
+"""TextParser.parse_questions の処理速度（lines/sec）
+
+過去問をまとめて /pdf/upload-text で取り込む場合を想定し、
+問題番号・選択肢・答え・解説・本文が混ざった合成の問題集（既定10万行）を解析する。
+
+    cd backend
+    python benchmarks/bench_text_parser.py --lines 100000 --repeat 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.text_parser import TextParser
+
+
+def build_question_bank(num_lines: int, seed: int = 1) -> str:
+    """実際の問題集に近い行の並び（問題→本文→選択肢4つ→答え→解説）を繰り返した合成データ"""
+    rng = random.Random(seed)
+    headers = ["問{n} 次の言葉の読み方として最もよいものを選びなさい。", "問題{n}: 読み方", "Question{n}. Choose one"]
+    choices = ["{c} けいざい", "{c}) けいさい", "{c}. きょうざい", "{c}：けいたい"]
+    answers = ["答え：{d}", "答: {d}", "正解 {d}", "Answer {d}"]
+    lines = []
+    n = 0
+    while len(lines) < num_lines:
+        n += 1
+        lines.append(rng.choice(headers).format(n=n))
+        for _ in range(rng.randint(0, 3)):
+            lines.append("経済" * rng.randint(1, 20))
+        for c in range(1, 5):
+            lines.append(rng.choice(choices).format(c=c))
+        lines.append(rng.choice(answers).format(d=rng.randint(1, 4)))
+        if rng.random() < 0.5:
+            lines.append("解説：" + "説明文" * rng.randint(1, 10))
+        lines.append("")
+    return "\n".join(lines[:num_lines])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100_000, help="合成する行数")
+    parser.add_argument("--repeat", type=int, default=5, help="計測の繰り返し回数（最速の回を表示）")
+    args = parser.parse_args()
+
+    text = build_question_bank(args.lines)
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        questions = TextParser.parse_questions(text)
+        timings.append(time.perf_counter() - started)
+
+    best = min(timings)
+    print(f"{args.lines:,} lines -> {len(questions):,} questions")
+    print(f"best {best * 1000:.1f}ms  {args.lines / best:,.0f} lines/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""tesserocrの代わり（エンジン作成時だけ言語データの読み込みに相当する時間待つ）"""
+import os
+import time
+
+
+class PyTessBaseAPI:
+    def __init__(self, lang=None):
+        time.sleep(float(os.environ.get("OCR_SHIM_LOAD_SECONDS", "0")))
+
+    def SetImage(self, image):
+        self._size = image.size
+
+    def GetUTF8Text(self):
+        return "x\n"
@@ -1,11 +1,27 @@
+import asyncio
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app.answer_buffer import answer_buffer
 from app.api.v1 import auth, exams, attempts, pdf
+from app.config import get_settings
 from app.database import engine
-from app.models import Base
+from app.metrics import render_metrics
+from app.ocr import shutdown_ocr_executor
+from app.pdf_parser import shutdown_pdf_executor
+from app.upload_limit import UploadSizeLimitMiddleware
+from app.models import Base, create_missing_indexes
+
+logging.basicConfig(
+    level=get_settings().log_level.upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+# 既存DBに後から追加したインデックスを作成
+create_missing_indexes(engine)
 
 app = FastAPI(
     title="Mock Nihongo API",
@@ -13,6 +29,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# アップロードの大きさをmultipart解析の前に制限（スプールし終える前に拒否する。413にもCORSヘッダーが付くようCORSより内側に置く）
+app.add_middleware(UploadSizeLimitMiddleware, path_prefixes=("/api/v1/pdf",), max_mb=pdf.MAX_UPLOAD_MB)
+
 # CORS設定
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +39,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # ルーター登録
@@ -28,6 +48,26 @@ app.include_router(exams.router, prefix="/api/v1/exams", tags=["exams"])
 app.include_router(attempts.router, prefix="/api/v1/attempts", tags=["attempts"])
 app.include_router(pdf.router, prefix="/api/v1/pdf", tags=["pdf"])
 
+_answer_flush_task = None
+
+@app.on_event("startup")
+async def startup():
+    global _answer_flush_task
+    settings = get_settings()
+    if settings.answer_write_behind:
+        _answer_flush_task = asyncio.create_task(
+            answer_buffer.run_periodic_flush(settings.answer_flush_interval_seconds)
+        )
+
+@app.on_event("shutdown")
+async def shutdown():
+    if _answer_flush_task is not None:
+        _answer_flush_task.cancel()
+    # 停止前にバッファ内の回答を書き込む
+    await answer_buffer.flush()
+    shutdown_ocr_executor()
+    shutdown_pdf_executor()
+
 @app.get("/")
 async def root():
     return {"message": "Mock Nihongo API", "status": "running"}
@@ -36,6 +76,11 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """処理時間ヒストグラム（Prometheusテキスト形式）"""
+    return render_metrics()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,118 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+# app をimportする前に、テスト用のDBと設定にする
+_tmp_dir = tempfile.mkdtemp(prefix="mock_nihongo_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/test.db"
+os.environ["UPLOAD_CACHE_DIR"] = os.path.join(_tmp_dir, "upload_cache")
+os.environ["BCRYPT_ROUNDS"] = "4"
+# キャッシュを無効にして、毎回DBを読む場合のSQL数を測る
+os.environ["EXAM_CACHE_MAX_ENTRIES"] = "0"
+os.environ["ANSWER_KEY_CACHE_MAX_ENTRIES"] = "0"
+os.environ["AUTH_USER_CACHE_TTL_SECONDS"] = "0"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import async_engine, engine
+from main import app
+
+
+class StatementCounter:
+    """同期・非同期エンジンで実行されたSQL文を記録（接続時のPRAGMAは除く）"""
+
+    def __init__(self):
+        self.statements = []
+        self.active = False
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active and not statement.lstrip().upper().startswith("PRAGMA"):
+            self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def count_statements():
+    """with count_statements() as counter: の範囲で実行されたSQL文を数える"""
+    counter = StatementCounter()
+    targets = (engine, async_engine.sync_engine)
+    for target in targets:
+        event.listen(target, "before_cursor_execute", counter)
+
+    @contextmanager
+    def counting():
+        counter.statements = []
+        counter.active = True
+        try:
+            yield counter
+        finally:
+            counter.active = False
+
+    yield counting
+    for target in targets:
+        event.remove(target, "before_cursor_execute", counter)
+
+
+def _auth_headers(client, username: str) -> dict:
+    client.post("/api/v1/auth/register", json={"username": username, "name": username, "password": "pw"})
+    token = client.post(
+        "/api/v1/auth/login", data={"username": username, "password": "pw"}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    return _auth_headers(client, "query_count_user")
+
+
+@pytest.fixture(scope="session")
+def exam_id(client, auth_headers):
+    """3セクション×5問の公開試験"""
+    sections = [
+        {
+            "title": f"セクション{s + 1}",
+            "order": s + 1,
+            "questions": [
+                {
+                    "order": q + 1,
+                    "type": "kanji_reading",
+                    "prompt_text": f"問{q + 1}",
+                    "choices": ["あ", "い", "う", "え"],
+                    "answer": ["あ"]
+                }
+                for q in range(5)
+            ]
+        }
+        for s in range(3)
+    ]
+    response = client.post("/api/v1/exams/import", json={
+        "title": "SQL数テスト", "level": "N3", "type": "mock", "mode": "practice",
+        "is_public": True, "sections": sections
+    }, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+@pytest.fixture(scope="session")
+def attempt_id(client, auth_headers, exam_id):
+    """回答・終了済みの受験"""
+    started = client.post("/api/v1/attempts", json={"exam_id": exam_id}, headers=auth_headers).json()
+    questions = [q for section in started["exam"]["sections"] for q in section["questions"]]
+    client.post(f"/api/v1/attempts/{started['attempt_id']}/answers", json={
+        "answers": [{"question_id": q["id"], "selected": ["あ"]} for q in questions]
+    }, headers=auth_headers)
+    client.post(f"/api/v1/attempts/{started['attempt_id']}/finish", headers=auth_headers)
+    return started["attempt_id"]
@@ -0,0 +1,39 @@
+"""パスワードの再ハッシュとトークンのバージョン"""
+from passlib.context import CryptContext
+
+import app.auth as auth
+from app.database import SessionLocal
+from app.models import User
+
+
+def _login(client, username: str) -> str:
+    return client.post(
+        "/api/v1/auth/login", data={"username": username, "password": "pw"}
+    ).json()["access_token"]
+
+
+def _stored_hash(username: str) -> str:
+    with SessionLocal() as db:
+        return db.query(User).filter(User.username == username).one().hashed_password
+
+
+def test_cost_rehash_keeps_existing_tokens_valid(client, monkeypatch):
+    client.post("/api/v1/auth/register", json={"username": "rehash_user", "name": "rehash", "password": "pw"})
+    token = _login(client, "rehash_user")
+    old_hash = _stored_hash("rehash_user")
+
+    rounds = auth.settings.bcrypt_rounds + 1
+    monkeypatch.setattr(auth.settings, "bcrypt_rounds", rounds)
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(
+        schemes=["bcrypt"], deprecated="auto",
+        bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds
+    ))
+    new_token = _login(client, "rehash_user")
+
+    new_hash = _stored_hash("rehash_user")
+    assert new_hash != old_hash
+    assert new_hash.startswith(f"$2b${rounds:02d}$")
+    # 再ハッシュ前のトークンも引き続き使える
+    for t in (token, new_token):
+        response = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {t}"})
+        assert response.status_code == 200, response.text
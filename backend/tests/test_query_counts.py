@@ -0,0 +1,61 @@
+"""主要な読み取りエンドポイントのSQL数（N+1クエリの再発を検出する）
+
+上限はキャッシュを無効にした状態（conftest.py）で1リクエストあたりに実行されるSQL文の数。
+クエリを減らした場合は上限も下げること。
+"""
+import pytest
+
+# エンドポイント名 -> 1リクエストあたりのSQL文の上限
+MAX_STATEMENTS = {
+    "get_exam": 4,
+    "get_exam_with_answers": 4,
+    "get_exams": 2,
+    "get_my_attempts": 2,
+    "get_attempt": 2,
+    "start_attempt": 7,
+}
+
+
+def _request(client, name, auth_headers, exam_id, attempt_id):
+    if name == "get_exam":
+        return client.get(f"/api/v1/exams/{exam_id}", headers=auth_headers)
+    if name == "get_exam_with_answers":
+        return client.get(f"/api/v1/exams/{exam_id}/with-answers", headers=auth_headers)
+    if name == "get_exams":
+        return client.get("/api/v1/exams", headers=auth_headers)
+    if name == "get_my_attempts":
+        return client.get("/api/v1/attempts/my-history", params={"limit": 10}, headers=auth_headers)
+    if name == "get_attempt":
+        return client.get(f"/api/v1/attempts/{attempt_id}", headers=auth_headers)
+    if name == "start_attempt":
+        return client.post("/api/v1/attempts", json={"exam_id": exam_id}, headers=auth_headers)
+    raise ValueError(name)
+
+
+@pytest.mark.parametrize("name", sorted(MAX_STATEMENTS))
+def test_statement_count(client, auth_headers, exam_id, attempt_id, count_statements, name):
+    with count_statements() as counter:
+        response = _request(client, name, auth_headers, exam_id, attempt_id)
+    assert response.status_code in (200, 201), response.text
+    assert counter.count <= MAX_STATEMENTS[name], "\n".join(counter.statements)
+
+
+def test_statement_count_does_not_grow_with_rows(client, auth_headers, exam_id, count_statements):
+    """試験一覧と受験履歴のSQL数は件数に比例しない"""
+    urls = ["/api/v1/attempts/my-history?limit=10", "/api/v1/exams"]
+
+    def counts():
+        result = []
+        for url in urls:
+            with count_statements() as counter:
+                client.get(url, headers=auth_headers)
+            result.append(counter.count)
+        return result
+
+    before = counts()
+    for _ in range(3):
+        client.post("/api/v1/attempts", json={"exam_id": exam_id}, headers=auth_headers)
+        client.post("/api/v1/exams", json={
+            "title": "追加", "level": "N3", "type": "mock", "mode": "practice", "is_public": True
+        }, headers=auth_headers)
+    assert counts() == before
@@ -0,0 +1,24 @@
+"""再採点の開始・状態遷移"""
+from app.answer_buffer import answer_buffer
+
+
+def test_flush_error_does_not_leave_regrade_running(client, auth_headers, exam_id, attempt_id, monkeypatch):
+    async def failing_flush():
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(answer_buffer, "flush", failing_flush)
+    response = client.post(f"/api/v1/exams/{exam_id}/regrade", headers=auth_headers)
+    assert response.status_code == 500
+
+    status = client.get(f"/api/v1/exams/{exam_id}/regrade", headers=auth_headers).json()
+    assert status["status"] == "failed"
+    assert status["error"] == "disk full"
+
+    # 失敗後は再実行できる
+    monkeypatch.undo()
+    response = client.post(f"/api/v1/exams/{exam_id}/regrade", headers=auth_headers)
+    assert response.status_code == 202
+
+    status = client.get(f"/api/v1/exams/{exam_id}/regrade", headers=auth_headers).json()
+    assert status["status"] == "completed"
+    assert status["processed_attempts"] >= 1
@@ -0,0 +1,27 @@
+"""既存DBへの後から追加したインデックスの作成"""
+from sqlalchemy import create_engine, inspect, text
+
+from app.models import Base, create_missing_indexes
+
+
+def test_creates_upsert_index_on_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # インデックス追加前のDB（重複行あり）を再現
+        conn.execute(text("DROP INDEX ix_attempt_items_attempt_question"))
+        conn.execute(text(
+            "INSERT INTO attempt_items (attempt_id, question_id, selected) "
+            "VALUES (1, 1, '[\"a\"]'), (1, 1, '[\"b\"]'), (1, 2, '[\"c\"]')"
+        ))
+
+    create_missing_indexes(engine)
+    create_missing_indexes(engine)  # 2回目は何もしない
+
+    index_names = {index["name"] for index in inspect(engine).get_indexes("attempt_items")}
+    assert "ix_attempt_items_attempt_question" in index_names
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT question_id, selected FROM attempt_items ORDER BY question_id"
+        )).all()
+    assert rows == [(1, '["b"]'), (2, '["c"]')]
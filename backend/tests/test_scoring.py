@@ -0,0 +1,117 @@
+"""正解キーの作成と採点（配点・セクション基準点・合否）"""
+from app.answer_key import build_answer_key
+from app.scoring import ScoringRules, score_attempt, score_attempts
+
+
+def _answer_key(sections, counts):
+    """sections: (section_id, title, weight) の列、counts: セクションごとの問題数（正解は全て「あ」）"""
+    question_rows = []
+    for (section_id, _, _), count in zip(sections, counts):
+        for _ in range(count):
+            question_rows.append((len(question_rows) + 1, section_id, ["あ"], None))
+    return build_answer_key(sections, question_rows)
+
+
+def _mask(answer_key, question_ids):
+    return answer_key.correct_mask((question_id, True) for question_id in question_ids)
+
+
+def test_build_answer_key_assigns_bits_per_section():
+    answer_key = _answer_key([(1, "言語知識", 1), (2, "読解", None)], [2, 3])
+
+    assert answer_key.section_weights == [1, 1]
+    assert answer_key.section_masks == [0b00011, 0b11100]
+    assert answer_key.grade(3, ["あ"]) is True
+    assert answer_key.grade(3, ["い"]) is False
+    assert answer_key.grade(99, ["あ"]) is None
+    # 不正解・他の試験の問題はマスクに含めない
+    assert answer_key.correct_mask([(1, True), (2, False), (99, True)]) == 0b00001
+
+
+def test_section_weights_split_max_score():
+    answer_key = _answer_key([(1, "言語知識", 1), (2, "読解", 2)], [4, 4])
+    rules = ScoringRules.from_config({"max_score": 180})
+
+    result = score_attempt(answer_key, _mask(answer_key, [1, 2, 5, 6, 7, 8]), rules)
+
+    assert result.section_scores["言語知識"]["max_score"] == 60
+    assert result.section_scores["読解"]["max_score"] == 120
+    assert result.section_scores["言語知識"]["score"] == 30
+    assert result.section_scores["読解"]["score"] == 120
+    assert result.score == 150
+    assert result.correct_count == 6
+
+
+def test_empty_section_gets_no_points():
+    answer_key = _answer_key([(1, "言語知識", 1), (2, "空", 1), (3, "読解", 1)], [2, 0, 2])
+    rules = ScoringRules.from_config({"max_score": 100, "section_min_score": 10})
+
+    result = score_attempt(answer_key, _mask(answer_key, [1, 2, 3, 4]), rules)
+
+    assert result.section_scores["空"] == {
+        "correct": 0, "total": 0, "percentage": 0, "score": 0, "max_score": 0, "passed": None
+    }
+    assert result.score == 100
+    assert result.is_passed is True
+
+
+def test_unanswered_questions_count_in_denominator():
+    answer_key = _answer_key([(1, "言語知識", 1)], [4])
+    rules = ScoringRules.from_config({"max_score": 100})
+
+    # 4問中1問だけ回答して正解
+    result = score_attempt(answer_key, answer_key.correct_mask([(1, True)]), rules)
+
+    assert result.total_questions == 4
+    assert result.section_scores["言語知識"]["percentage"] == 25
+    assert result.score == 25
+    assert result.is_passed is False
+
+
+def test_section_min_score_fails_even_when_total_passes():
+    answer_key = _answer_key([(1, "言語知識", 1), (2, "読解", 1), (3, "聴解", 1)], [5, 5, 5])
+    rules = ScoringRules.from_config({
+        "max_score": 180, "pass_threshold": 90, "section_min_score": {"聴解": 19}
+    })
+
+    # 聴解は5問中2問（24点）で基準点以上、1問（12点）では基準点未満
+    passing = score_attempt(answer_key, _mask(answer_key, list(range(1, 11)) + [11, 12]), rules)
+    failing = score_attempt(answer_key, _mask(answer_key, list(range(1, 11)) + [11]), rules)
+
+    assert passing.is_passed is True
+    assert failing.score == 132
+    assert failing.section_scores["聴解"]["passed"] is False
+    assert failing.section_scores["言語知識"]["passed"] is None
+    assert failing.is_passed is False
+
+
+def test_section_scores_add_up_to_total():
+    answer_key = _answer_key([(1, "言語知識", 1), (2, "読解", 1), (3, "聴解", 1)], [3, 7, 4])
+    rules = ScoringRules.from_config({"max_score": 100})
+
+    results = score_attempts(answer_key, range(1 << 14), rules)
+
+    for result in results:
+        assert sum(section["score"] for section in result.section_scores.values()) == result.score
+        assert all(section["score"] <= section["max_score"] for section in result.section_scores.values())
+    assert results[-1].score == 100
+
+
+def test_no_config_has_no_pass_judgement():
+    answer_key = _answer_key([(1, "言語知識", 1)], [2])
+
+    for config in (None, {}):
+        result = score_attempt(answer_key, _mask(answer_key, [1, 2]), ScoringRules.from_config(config))
+        assert result.score == 100
+        assert result.is_passed is None
+
+
+def test_default_pass_threshold_scales_with_max_score():
+    assert ScoringRules.from_config({"max_score": 180}).pass_threshold == 108
+    assert ScoringRules.from_config({"max_score": 180, "pass_threshold": None}).pass_threshold == 108
+    assert ScoringRules.from_config({"pass_threshold": 70}).pass_threshold == 70
+
+    answer_key = _answer_key([(1, "言語知識", 1)], [10])
+    rules = ScoringRules.from_config({"max_score": 180})
+    assert score_attempt(answer_key, _mask(answer_key, range(1, 6)), rules).is_passed is False
+    assert score_attempt(answer_key, _mask(answer_key, range(1, 7)), rules).is_passed is True
@@ -5,6 +5,8 @@ import {
   Token, 
   User,
   Exam,
+  ExamPage,
+  RegradeStatus,
   AttemptCreate,
   AttemptStart,
   AttemptSubmit,
@@ -45,9 +47,19 @@ export const examAPI = {
     level?: string;
     type?: string;
     is_public?: boolean;
-  }): Promise<Exam[]> => {
-    const response = await api.get('/exams', { params });
-    return response.data;
+    mine?: boolean;
+    include_total?: boolean;
+  }, cursor?: string): Promise<ExamPage> => {
+    // 一覧はカーソルページネーション。続きは nextCursor を渡して必要になったときに取得する
+    const response = await api.get('/exams', {
+      params: { ...params, cursor },
+    });
+    const total = response.headers['x-total-count'];
+    return {
+      exams: response.data,
+      nextCursor: response.headers['x-next-cursor'],
+      total: total !== undefined ? Number(total) : undefined,
+    };
   },
   
   getExam: async (examId: number): Promise<Exam> => {
@@ -60,6 +72,12 @@ export const examAPI = {
     return response.data;
   },
   
+  // 試験・セクション・問題を1リクエストで一括登録
+  importExam: async (data: any): Promise<Exam> => {
+    const response = await api.post('/exams/import', data);
+    return response.data;
+  },
+  
   updateExam: async (examId: number, data: any): Promise<Exam> => {
     const response = await api.put(`/exams/${examId}`, data);
     return response.data;
@@ -80,6 +98,17 @@ export const examAPI = {
     const response = await api.post(`/exams/${examId}/sections/${sectionId}/questions`, data);
     return response.data;
   },
+
+  // 全受験の再採点（正解修正・採点ルール変更後）
+  regradeExam: async (examId: number): Promise<RegradeStatus> => {
+    const response = await api.post(`/exams/${examId}/regrade`);
+    return response.data;
+  },
+
+  getRegradeStatus: async (examId: number): Promise<RegradeStatus> => {
+    const response = await api.get(`/exams/${examId}/regrade`);
+    return response.data;
+  },
 };
 
 // 試験受験API
@@ -115,6 +144,43 @@ export const attemptAPI = {
   },
 };
 
+// NDJSONのストリームを1行ずつ読み、イベントごとにコールバックを呼ぶ
+// （axiosはレスポンスを逐次読めないためfetchを使う）
+const readNDJSONStream = async (
+  path: string,
+  init: RequestInit,
+  onEvent: (event: any) => void
+): Promise<void> => {
+  const token = localStorage.getItem('token');
+  const response = await fetch(`${api.defaults.baseURL}${path}`, {
+    ...init,
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+  });
+  if (!response.ok || !response.body) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.detail || `HTTP ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() || '';
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.type === 'error') {
+        throw new Error(event.detail);
+      }
+      onEvent(event);
+    }
+  }
+};
+
 // PDF API
 export const pdfAPI = {
   uploadPDF: async (file: File): Promise<any> => {
@@ -155,4 +221,28 @@ export const pdfAPI = {
     });
     return response.data;
   },
+
+  // ページの抽出進捗と問題を抽出した順に受け取る
+  uploadPDFStream: async (file: File, onEvent: (event: any) => void): Promise<void> => {
+    const formData = new FormData();
+    formData.append('file', file);
+    await readNDJSONStream('/pdf/upload/stream', { method: 'POST', body: formData }, onEvent);
+  },
+
+  createOCRJob: async (file: File): Promise<any> => {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    const response = await api.post('/pdf/ocr/jobs', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data;
+  },
+
+  // OCRジョブの結果をページが完了するたびに受け取る
+  streamOCRJob: async (jobId: string, onEvent: (event: any) => void): Promise<void> => {
+    await readNDJSONStream(`/pdf/ocr/jobs/${jobId}/stream`, { method: 'GET' }, onEvent);
+  },
 };
@@ -302,7 +302,20 @@ const CreateExam: React.FC = () => {
     setLoading(true);
 
     try {
-      const result = await pdfAPI.uploadPDF(file);
+      // 抽出した問題を順に受け取り、進捗を表示する
+      const result: any = { success: false, questions: [], extracted_text_preview: '' };
+      await pdfAPI.uploadPDFStream(file, (event) => {
+        if (event.type === 'start' || event.type === 'page') {
+          setUploadProgress(
+            `抽出中... ${event.completed_pages || 0} / ${event.total_pages} ページ（${result.questions.length}問）`
+          );
+        } else if (event.type === 'question') {
+          result.questions.push(event.question);
+        } else if (event.type === 'done') {
+          result.success = true;
+          result.extracted_text_preview = event.extracted_text_preview;
+        }
+      });
       
       if (result.success) {
         setExtractedQuestions(result.questions);
@@ -451,12 +464,22 @@ const CreateExam: React.FC = () => {
     setUploadProgress('OCR処理中...');
 
     try {
-      const result = await pdfAPI.ocrProcess(file);
+      // ジョブとして登録し、完了したページから順に表示する
+      const job = await pdfAPI.createOCRJob(file);
+      const pages: string[] = [];
+      setOcrText('');
+      setUploadProgress(`OCR処理中... 0 / ${job.total_pages} ページ`);
       
-      if (result.success) {
-        setOcrText(result.extracted_text);
-        setUploadProgress('✅ OCR処理が完了しました。テキストを確認・編集して「このテキストから問題を抽出」をクリックしてください。');
-      }
+      await pdfAPI.streamOCRJob(job.job_id, (event) => {
+        if (event.type === 'page') {
+          pages[event.page] = event.text;
+          setOcrText(pages.filter((text) => text !== undefined).join('\n\n'));
+          setUploadProgress(`OCR処理中... ${event.completed_pages} / ${event.total_pages} ページ`);
+        } else if (event.type === 'done') {
+          setOcrText(event.extracted_text);
+          setUploadProgress('✅ OCR処理が完了しました。テキストを確認・編集して「このテキストから問題を抽出」をクリックしてください。');
+        }
+      });
     } catch (error: any) {
       console.error('OCR processing failed:', error);
       setUploadProgress('');
@@ -572,39 +595,32 @@ const CreateExam: React.FC = () => {
         alert('試験を更新しました！');
         navigate(`/exams/${examId}`);
       } else {
-        // 作成モード：新しい試験を作成
-        const exam = await examAPI.createExam({
+        // 作成モード：試験・セクション・問題をまとめて作成
+        const exam = await examAPI.importExam({
           title,
           level,
           type: 'mock',
           mode: 'practice',
           is_public: isPublic,
-          config: { pass_threshold: passThreshold }
+          config: { pass_threshold: passThreshold },
+          sections: sections
+            .filter(section => section.questions.length > 0)
+            .map(section => ({
+              title: section.title,
+              order: section.order,
+              time_limit_seconds: section.time_limit_seconds,
+              weight: section.weight,
+              questions: section.questions.map(question => ({
+                order: question.order,
+                type: question.type,
+                prompt_text: question.prompt_text,
+                choices: question.choices.filter(c => c.trim() !== ''),
+                answer: question.answer,
+                explanation_text: question.explanation_text,
+                question_metadata: question.meta
+              }))
+            }))
         });
-
-        // 各セクションと問題を作成
-        for (const section of sections) {
-          if (section.questions.length === 0) continue;
-          
-          const createdSection = await examAPI.createSection(exam.id, {
-            title: section.title,
-            order: section.order,
-            time_limit_seconds: section.time_limit_seconds,
-            weight: section.weight
-          });
-
-          for (const question of section.questions) {
-            await examAPI.createQuestion(exam.id, createdSection.id, {
-              order: question.order,
-              type: question.type,
-              prompt_text: question.prompt_text,
-              choices: question.choices.filter(c => c.trim() !== ''),
-              answer: question.answer,
-              explanation_text: question.explanation_text,
-              question_metadata: question.meta
-            });
-          }
-        }
         
         alert('試験を作成しました！');
         navigate(`/exams/${exam.id}`);
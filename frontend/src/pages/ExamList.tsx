@@ -7,6 +7,8 @@ const ExamList: React.FC = () => {
   const [searchParams] = useSearchParams();
   const [exams, setExams] = useState<Exam[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedLevel, setSelectedLevel] = useState<string>(searchParams.get('level') || '');
 
   useEffect(() => {
@@ -17,8 +19,9 @@ const ExamList: React.FC = () => {
     setLoading(true);
     try {
       const params = selectedLevel ? { level: selectedLevel } : undefined;
-      const data = await examAPI.getExams(params);
-      setExams(data);
+      const page = await examAPI.getExams(params);
+      setExams(page.exams);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Failed to fetch exams:', error);
     } finally {
@@ -26,6 +29,22 @@ const ExamList: React.FC = () => {
     }
   };
 
+  // 次のページを取得して末尾に追加
+  const fetchMoreExams = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const params = selectedLevel ? { level: selectedLevel } : undefined;
+      const page = await examAPI.getExams(params, nextCursor);
+      setExams((current) => [...current, ...page.exams]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to fetch more exams:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const levels = ['N5', 'N4', 'N3', 'N2', 'N1'];
 
   return (
@@ -68,6 +87,7 @@ const ExamList: React.FC = () => {
           <p className="text-gray-500">試験が見つかりません</p>
         </div>
       ) : (
+        <>
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
           {exams.map((exam) => (
             <div key={exam.id} className="bg-white rounded-lg shadow-md p-6 hover:shadow-lg transition-shadow">
@@ -97,6 +117,19 @@ const ExamList: React.FC = () => {
             </div>
           ))}
         </div>
+
+        {nextCursor && (
+          <div className="mt-8 text-center">
+            <button
+              onClick={fetchMoreExams}
+              disabled={loadingMore}
+              className="px-6 py-2 bg-gray-200 text-gray-700 rounded-md hover:bg-gray-300 disabled:opacity-50"
+            >
+              {loadingMore ? '読み込み中...' : 'さらに読み込む'}
+            </button>
+          </div>
+        )}
+        </>
       )}
     </div>
   );
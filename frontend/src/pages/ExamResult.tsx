@@ -55,7 +55,8 @@ const ExamResult: React.FC = () => {
     (sum: number, section: any) => sum + section.correct,
     0
   );
-  const isPassed = attempt.score && attempt.score >= (exam.config?.pass_threshold || 60);
+  // 合否はサーバー側で判定済み（セクション基準点を含む）。古い結果は得点から判定する
+  const isPassed = attempt.is_passed ?? (attempt.score && attempt.score >= (exam.config?.pass_threshold || 60));
 
   return (
     <div className="max-w-4xl mx-auto">
@@ -1,8 +1,10 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { examAPI, attemptAPI } from '../api';
 import { useAuthStore } from '../store/authStore';
-import { Exam, Attempt } from '../types';
+import { Exam, Attempt, RegradeStatus } from '../types';
+
+const REGRADE_POLL_INTERVAL_MS = 2000;
 
 const MyPage: React.FC = () => {
   const navigate = useNavigate();
@@ -10,8 +12,13 @@ const MyPage: React.FC = () => {
   const [activeTab, setActiveTab] = useState<'created' | 'history'>('created');
   
   const [createdExams, setCreatedExams] = useState<Exam[]>([]);
+  const [createdTotal, setCreatedTotal] = useState(0);
+  const [createdCursor, setCreatedCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
   const [attemptHistory, setAttemptHistory] = useState<Attempt[]>([]);
   const [loading, setLoading] = useState(true);
+  const [regrades, setRegrades] = useState<Record<number, RegradeStatus>>({});
+  const regradeTimers = useRef<Record<number, number>>({});
 
   useEffect(() => {
     if (!isAuthenticated) {
@@ -21,13 +28,22 @@ const MyPage: React.FC = () => {
     fetchData();
   }, [isAuthenticated, navigate]);
 
+  // ページを離れたら進捗のポーリングを止める
+  useEffect(() => {
+    const timers = regradeTimers.current;
+    return () => {
+      Object.values(timers).forEach((timer) => window.clearTimeout(timer));
+    };
+  }, []);
+
   const fetchData = async () => {
     setLoading(true);
     try {
-      // 作成した試験を取得（全試験から自分が作成したものをフィルタ）
-      const allExams = await examAPI.getExams();
-      const myExams = allExams.filter((exam: Exam) => exam.creator_id === user?.id);
-      setCreatedExams(myExams);
+      // 作成した試験を取得（最初のページのみ。続きは「さらに読み込む」で取得）
+      const page = await examAPI.getExams({ mine: true, include_total: true });
+      setCreatedExams(page.exams);
+      setCreatedTotal(page.total ?? page.exams.length);
+      setCreatedCursor(page.nextCursor);
 
       // 受験履歴を取得
       try {
@@ -44,6 +60,20 @@ const MyPage: React.FC = () => {
     }
   };
 
+  const fetchMoreCreatedExams = async () => {
+    if (!createdCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await examAPI.getExams({ mine: true }, createdCursor);
+      setCreatedExams((current) => [...current, ...page.exams]);
+      setCreatedCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to fetch more exams:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDeleteExam = async (examId: number) => {
     if (!confirm('この試験を削除してもよろしいですか？')) {
       return;
@@ -52,6 +82,7 @@ const MyPage: React.FC = () => {
     try {
       await examAPI.deleteExam(examId);
       setCreatedExams(createdExams.filter((exam) => exam.id !== examId));
+      setCreatedTotal((total) => total - 1);
       alert('試験を削除しました');
     } catch (error: any) {
       console.error('Failed to delete exam:', error);
@@ -60,6 +91,52 @@ const MyPage: React.FC = () => {
     }
   };
 
+  const pollRegradeStatus = (examId: number) => {
+    regradeTimers.current[examId] = window.setTimeout(async () => {
+      try {
+        const regrade = await examAPI.getRegradeStatus(examId);
+        setRegrades((current) => ({ ...current, [examId]: regrade }));
+        if (regrade.status === 'running') {
+          pollRegradeStatus(examId);
+          return;
+        }
+      } catch (error) {
+        console.error('Failed to fetch regrade status:', error);
+      }
+      delete regradeTimers.current[examId];
+    }, REGRADE_POLL_INTERVAL_MS);
+  };
+
+  const handleRegradeExam = async (examId: number) => {
+    if (!confirm('この試験の全受験を現在の正解で再採点しますか？')) {
+      return;
+    }
+
+    try {
+      const regrade = await examAPI.regradeExam(examId);
+      setRegrades((current) => ({ ...current, [examId]: regrade }));
+      pollRegradeStatus(examId);
+    } catch (error: any) {
+      console.error('Failed to start regrade:', error);
+      const message = error.response?.status === 409
+        ? '再採点はすでに実行中です'
+        : error.response?.data?.detail || '再採点の開始に失敗しました';
+      alert(message);
+    }
+  };
+
+  const regradeLabel = (regrade: RegradeStatus) => {
+    if (regrade.status === 'running') {
+      return regrade.total_attempts
+        ? `再採点中… ${regrade.processed_attempts} / ${regrade.total_attempts} 件`
+        : '再採点中…';
+    }
+    if (regrade.status === 'completed') {
+      return `再採点完了（${regrade.processed_attempts} 件、正誤変更 ${regrade.changed_items} 問）`;
+    }
+    return `再採点失敗: ${regrade.error ?? '不明なエラー'}`;
+  };
+
   const handleEditExam = (examId: number) => {
     navigate(`/edit-exam/${examId}`);
   };
@@ -114,7 +191,7 @@ const MyPage: React.FC = () => {
                 : 'text-gray-600'
             }`}
           >
-            作成した試験（{createdExams.length}）
+            作成した試験（{createdTotal}）
           </button>
           <button
             onClick={() => setActiveTab('history')}
@@ -181,6 +258,15 @@ const MyPage: React.FC = () => {
                           モード: {exam.mode === 'formal' ? '本格試験' : '模擬試験'}
                         </p>
                         <p>作成日: {new Date(exam.created_at).toLocaleDateString('ja-JP')}</p>
+                        {regrades[exam.id] && (
+                          <p
+                            className={
+                              regrades[exam.id].status === 'failed' ? 'text-red-600' : 'text-gray-600'
+                            }
+                          >
+                            {regradeLabel(regrades[exam.id])}
+                          </p>
+                        )}
                       </div>
                     </div>
 
@@ -197,6 +283,13 @@ const MyPage: React.FC = () => {
                       >
                         編集
                       </button>
+                      <button
+                        onClick={() => handleRegradeExam(exam.id)}
+                        disabled={regrades[exam.id]?.status === 'running'}
+                        className="px-4 py-2 bg-yellow-500 text-white rounded-md hover:bg-yellow-600 text-sm disabled:opacity-50"
+                      >
+                        再採点
+                      </button>
                       <button
                         onClick={() => handleTogglePublic(exam)}
                         className="px-4 py-2 bg-gray-200 text-gray-700 rounded-md hover:bg-gray-300 text-sm"
@@ -213,6 +306,18 @@ const MyPage: React.FC = () => {
                   </div>
                 </div>
               ))}
+
+              {createdCursor && (
+                <div className="text-center">
+                  <button
+                    onClick={fetchMoreCreatedExams}
+                    disabled={loadingMore}
+                    className="px-6 py-2 bg-gray-200 text-gray-700 rounded-md hover:bg-gray-300 disabled:opacity-50"
+                  >
+                    {loadingMore ? '読み込み中...' : 'さらに読み込む'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -69,6 +69,25 @@ export interface Exam {
   sections: Section[];
 }
 
+// 試験一覧の1ページ分（nextCursor があれば続きがある）
+export interface ExamPage {
+  exams: Exam[];
+  nextCursor?: string;
+  total?: number;
+}
+
+// 再採点の進捗（GET /exams/{id}/regrade）
+export interface RegradeStatus {
+  exam_id: number;
+  status: 'running' | 'completed' | 'failed';
+  total_attempts: number | null;
+  processed_attempts: number;
+  changed_items: number;
+  started_at: number;
+  finished_at: number | null;
+  error: string | null;
+}
+
 export interface Section {
   id: number;
   exam_id: number;
@@ -128,6 +147,9 @@ export interface AttemptFinish {
     correct: number;
     total: number;
     percentage: number;
+    score?: number;
+    max_score?: number;
+    passed?: boolean | null;
   }>;
   is_passed: boolean | null;
 }